@@ -1,4 +1,58 @@
-from .api import *
-from .dataviz import *
-from .indice import *
-from .modele import *
\ No newline at end of file
+# Chargement paresseux : les sous-modules (et leurs dépendances lourdes : pandas, statsmodels,
+# scikit-learn, matplotlib, openmeteo_requests...) ne sont importés qu'au premier accès à l'un
+# de leurs noms, par exemple `scripts.atmo` ou `from scripts import fit_arima`.
+import importlib
+
+_EXPORTS = {
+    "api": [
+        "BORNES_LATENCE", "MetriquesIO", "recup_data", "grille_regions", "poids_regionaux", "agreger_grille",
+        "recup_data_grille",
+    ],
+    "cache_figures": [
+        "VERSION_RENDU", "configurer_cache_figures", "vider_cache_figures", "empreinte_figure", "figure_en_cache",
+    ],
+    "dataviz": [
+        "lttb_indices", "minmax_indices", "time_series_france", "time_series_regions",
+        "plot_monthly_averages", "plot_pollutants", "resume_histogramme", "plot_climatic_histograms",
+        "plot_indice_atmo", "plot_atmo_maps", "render_atmo_maps", "export_atmo_timelapse",
+    ],
+    "features": ["colonnes_features", "empreinte_features", "construire_features", "vider_cache_features"],
+    "geometrie": ["CacheGeometrie", "TAILLE_CACHE_GEOMETRIE", "empreinte_geometrie", "obtenir_cache_geometrie"],
+    "indice": [
+        "get_subindex_pm10", "get_subindex_pm2_5", "get_subindex_no2", "get_subindex_o3",
+        "get_subindex_so2", "SEUILS_ATMO", "CATEGORIES_ATMO", "subindex_array", "categorie_array", "atmo",
+    ],
+    "instrumentation": ["instrumenter", "phase", "profilage", "instrumentation_active", "lire_profil"],
+    "modele": [
+        "stationarity_acf", "stationarity_table", "plot_autocorrelations", "ARIMA_ENGINES", "fit_arima",
+        "fit_arima_lot", "benchmark_arima_engines", "prediction_arima", "prevision_arima", "residus",
+        "prevision_var", "forecast_var", "SEPARATEUR_VAR", "pivot_var_regions", "VARRegions",
+        "fit_var_regions", "prevision_atmo_probabiliste", "indice_eval", "REGRESSEURS", "train_model",
+        "predict_future", "compare_regresseurs", "cv_temporelle", "train_models", "plot_predictions",
+        "train_predict_visualize",
+    ],
+    "parallele": ["nombre_processus", "executer_taches"],
+    "pipeline": ["construire_pipeline", "executer_pipeline", "charger_sortie"],
+    "spatial": ["IndexRegions", "attribuer_regions", "region_centroides"],
+    "serveur": ["ServeurPrevisions", "charger_modeles", "lancer_serveur", "mesurer_charge"],
+    "web": ["export_regions_geojson", "export_web_atmo"],
+}
+
+_MODULES = {nom: module for module, noms in _EXPORTS.items() for nom in noms}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(nom):
+    if nom in _EXPORTS:
+        return importlib.import_module(f".{nom}", __name__)
+    if nom in _MODULES:
+        valeur = getattr(importlib.import_module(f".{_MODULES[nom]}", __name__), nom)
+        # Mise en cache dans le package : les accès suivants ne passent plus par __getattr__
+        globals()[nom] = valeur
+        return valeur
+    raise AttributeError(f"module {__name__!r} has no attribute {nom!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES) | set(_EXPORTS))
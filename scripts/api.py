@@ -1,10 +1,150 @@
-import openmeteo_requests
-import requests_cache
-import pandas as pd
-from retry_requests import retry
-from openmeteo_requests import Client
+from .instrumentation import instrumenter, phase
 
-def recup_data(start_date, end_date, url, variables, region_centroides):
+# Bornes (en secondes) des classes de l'histogramme des latences de `MetriquesIO`
+BORNES_LATENCE = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class MetriquesIO:
+    """
+    Métriques d'entrées/sorties des appels à l'API Open-Meteo, par région et par point d'accès.
+
+    Enveloppe la méthode `request` d'une session `requests` (avec cache `requests_cache` et
+    reprises `retry_requests`) et enregistre pour chaque requête : la latence (reprises et attentes
+    de backoff comprises), les octets reçus, le service depuis le cache ou le réseau, le nombre de
+    reprises et les échecs (exception ou statut HTTP >= 400).
+    """
+
+    def __init__(self, bornes_latence=BORNES_LATENCE):
+        """
+        Parameters:
+        -----------
+        bornes_latence : tuple
+            Bornes supérieures (en secondes) des classes de l'histogramme des latences ; une
+            dernière classe reçoit les latences au-delà de la plus grande borne.
+        """
+        import threading
+
+        self.bornes_latence = tuple(bornes_latence)
+        self.region = None
+        self._stats = {}
+        self._verrou = threading.Lock()
+
+    def envelopper(self, session):
+        """
+        Instrumente `session` (modifiée sur place et renvoyée) : chaque requête est attribuée à la
+        région courante `self.region` et au point d'accès (hôte et chemin de l'URL).
+        """
+        import time
+        from urllib.parse import urlsplit
+
+        request = session.request
+
+        def request_mesuree(method, url, *args, **kwargs):
+            parties = urlsplit(url)
+            cle = (self.region, f"{parties.netloc}{parties.path}")
+            debut = time.perf_counter()
+            try:
+                reponse = request(method, url, *args, **kwargs)
+            except Exception:
+                self._enregistrer(cle, time.perf_counter() - debut, echec=True)
+                raise
+            cache = bool(getattr(reponse, "from_cache", False))
+            # Une réponse servie par le cache n'a déclenché aucune reprise réseau
+            retries = () if cache else getattr(getattr(reponse.raw, "retries", None), "history", None) or ()
+            self._enregistrer(
+                cle,
+                time.perf_counter() - debut,
+                octets=len(reponse.content),
+                cache=cache,
+                reprises=len(retries),
+                echec=reponse.status_code >= 400,
+            )
+            return reponse
+
+        session.request = request_mesuree
+        return session
+
+    def _enregistrer(self, cle, latence, octets=0, cache=False, reprises=0, echec=False):
+        import bisect
+
+        with self._verrou:
+            stats = self._stats.get(cle)
+            if stats is None:
+                stats = self._stats[cle] = {
+                    "requetes": 0, "echecs": 0, "cache_hits": 0, "cache_misses": 0, "reprises": 0,
+                    "octets": 0, "octets_reseau": 0, "latences": [],
+                    "histogramme": [0] * (len(self.bornes_latence) + 1),
+                }
+            stats["requetes"] += 1
+            stats["echecs"] += echec
+            stats["reprises"] += reprises
+            stats["octets"] += octets
+            if cache:
+                stats["cache_hits"] += 1
+            else:
+                stats["cache_misses"] += 1
+                stats["octets_reseau"] += octets
+            stats["latences"].append(latence)
+            stats["histogramme"][bisect.bisect_left(self.bornes_latence, latence)] += 1
+
+    def resume(self):
+        """
+        Renvoie un DataFrame avec une ligne par (région, point d'accès) : compteurs, octets,
+        latences ('latence_moy_s', 'latence_p50_s', 'latence_p95_s', 'latence_max_s') et une
+        colonne 'latence_le_<borne>' par classe de l'histogramme.
+        """
+        import numpy as np
+        import pandas as pd
+
+        lignes = []
+        for (region, endpoint), stats in self._stats.items():
+            latences = np.asarray(stats["latences"])
+            ligne = {"region": region, "endpoint": endpoint}
+            ligne.update({cle: valeur for cle, valeur in stats.items() if cle not in ("latences", "histogramme")})
+            ligne.update({
+                "latence_moy_s": latences.mean(),
+                "latence_p50_s": np.quantile(latences, 0.5),
+                "latence_p95_s": np.quantile(latences, 0.95),
+                "latence_max_s": latences.max(),
+            })
+            for borne, effectif in zip(self.bornes_latence + (float("inf"),), stats["histogramme"]):
+                ligne[f"latence_le_{borne}"] = effectif
+            lignes.append(ligne)
+        return pd.DataFrame(lignes)
+
+    def totaux(self):
+        """
+        Renvoie les compteurs agrégés sur toutes les régions et tous les points d'accès.
+        """
+        totaux = dict.fromkeys(("requetes", "echecs", "cache_hits", "cache_misses", "reprises", "octets", "octets_reseau"), 0)
+        for stats in self._stats.values():
+            for cle in totaux:
+                totaux[cle] += stats[cle]
+        latences = [latence for stats in self._stats.values() for latence in stats["latences"]]
+        totaux["latence_totale_s"] = sum(latences)
+        return totaux
+
+    def exporter(self, chemin):
+        """
+        Écrit le résumé dans `chemin` : CSV si l'extension est '.csv', sinon JSON (résumé par
+        région et point d'accès, totaux et bornes de l'histogramme).
+        """
+        import json
+
+        resume = self.resume()
+        if chemin.endswith(".csv"):
+            resume.to_csv(chemin, index=False)
+            return
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump({
+                "bornes_latence_s": list(self.bornes_latence),
+                "totaux": self.totaux(),
+                "par_region": json.loads(resume.to_json(orient="records")),
+            }, f, ensure_ascii=False, indent=1)
+
+
+@instrumenter
+def recup_data(start_date, end_date, url, variables, region_centroides, metriques=False):
     
     """
     Récupère des données climatiques horaires pour plusieurs régions via une API météorologique.
@@ -24,6 +164,10 @@ def recup_data(start_date, end_date, url, variables, region_centroides):
         - Nom de la région (str),
         - Longitude (float),
         - Latitude (float).
+    metriques : bool or MetriquesIO
+        Si True, collecte les métriques d'entrées/sorties des appels (voir `MetriquesIO`) et les
+        renvoie avec les données. Un `MetriquesIO` existant peut être passé pour cumuler les
+        métriques de plusieurs appels (par exemple sur toutes les périodes d'un rattrapage).
 
     Returns:
     --------
@@ -35,6 +179,8 @@ def recup_data(start_date, end_date, url, variables, region_centroides):
         - 'longitude' : Longitude de la région.
         - 'latitude' : Latitude de la région.
         - Variables météorologiques récupérées (une colonne par variable spécifiée).
+    MetriquesIO
+        Uniquement si `metriques` est activé : renvoie le couple (DataFrame, MetriquesIO).
 
     Description:
     ------------
@@ -58,12 +204,18 @@ def recup_data(start_date, end_date, url, variables, region_centroides):
     # Création de la session avec cache
     cache_session = requests_cache.CachedSession(backend="memory", expire_after=3600)
     retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
+    if metriques is True:
+        metriques = MetriquesIO()
+    if metriques:
+        metriques.envelopper(retry_session)
     openmeteo = Client(session=retry_session)
 
     # Dictionnaire pour stocker les DataFrames des régions
     region_dataframes = {}
 
     for region, longitude, latitude in region_centroides:
+        if metriques:
+            metriques.region = region
         try:
             params = {
                 "latitude": latitude,
@@ -74,7 +226,8 @@ def recup_data(start_date, end_date, url, variables, region_centroides):
             }
 
             # Appel à l'API
-            responses = openmeteo.weather_api(url, params=params)
+            with phase("requete"):
+                responses = openmeteo.weather_api(url, params=params)
             response = responses[0]  # Première réponse, si plusieurs localisations
 
             # Récupération des données horaires
@@ -104,10 +257,312 @@ def recup_data(start_date, end_date, url, variables, region_centroides):
             print(f"Erreur lors de la récupération des données pour {region}: {e}")
 
     # Concaténation de tous les DataFrames
-    combined_dataframe = pd.concat(region_dataframes.values(), ignore_index=True)
-    combined_dataframe['date'] = pd.to_datetime(combined_dataframe['date'])
-    # Création d'une nouvelle colonne 'day' contenant uniquement la date (sans l'heure)
-    combined_dataframe.insert(1,"day",combined_dataframe["date"].dt.date) 
+    with phase("assemblage") as p:
+        combined_dataframe = pd.concat(region_dataframes.values(), ignore_index=True)
+        combined_dataframe['date'] = pd.to_datetime(combined_dataframe['date'])
+        # Création d'une nouvelle colonne 'day' contenant uniquement la date (sans l'heure)
+        combined_dataframe.insert(1,"day",combined_dataframe["date"].dt.date) 
+        p.lignes(len(combined_dataframe))
+
+    if metriques:
+        return combined_dataframe, metriques
+    return combined_dataframe
+
+def grille_regions(france, pas=0.25, region_col="LIBELLE_REGION"):
+    """
+    Échantillonne une grille régulière de points longitude/latitude à l'intérieur de chaque région.
+
+    Parameters:
+    -----------
+    france : geopandas.GeoDataFrame ou IndexRegions
+        Régions avec géométries.
+    pas : float
+        Pas de la grille en degrés (par défaut 0.25°).
+    region_col : str
+        Colonne du nom des régions.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Colonnes 'longitude', 'latitude' et 'region', une ligne par point de grille situé dans une région.
+
+    Notes:
+    ------
+    - La grille est construite sur l'emprise de chaque région (et non sur celle de l'ensemble, qui
+      couvrirait le globe à cause des régions d'outre-mer), puis tous les points sont attribués
+      en une requête vectorisée sur l'index spatial.
+    - Une région plus petite que le pas reçoit au moins le point de son centroïde.
+    """
+    import numpy as np
+    import pandas as pd
+    import shapely
+    from .spatial import IndexRegions
+
+    index = france if isinstance(france, IndexRegions) else IndexRegions(france, region_col=region_col)
+    longitudes, latitudes, origines = [], [], []
+    for position, (xmin, ymin, xmax, ymax) in enumerate(shapely.bounds(index.geometries)):
+        lon, lat = np.meshgrid(
+            np.arange(np.floor(xmin / pas) * pas, xmax + pas, pas),
+            np.arange(np.floor(ymin / pas) * pas, ymax + pas, pas),
+        )
+        longitudes.append(lon.ravel())
+        latitudes.append(lat.ravel())
+        origines.append(np.full(lon.size, position))
+    longitudes, latitudes, origines = map(np.concatenate, (longitudes, latitudes, origines))
+
+    # Un point n'est gardé que pour la grille de sa propre région (les emprises se chevauchent)
+    dedans = index.localiser(longitudes, latitudes) == origines
+    points = pd.DataFrame({
+        "longitude": longitudes[dedans],
+        "latitude": latitudes[dedans],
+        "region": index.regions[origines[dedans]],
+    })
+    presentes = set(points["region"])
+    manquantes = [
+        (region, lon, lat) for region, lon, lat in index.centroides()
+        if region not in presentes
+    ]
+    if manquantes:
+        points = pd.concat([points, pd.DataFrame(manquantes, columns=["region", "longitude", "latitude"])], ignore_index=True)
+    return points
+
+
+def _coordonnees_3d(longitudes, latitudes):
+    """
+    Convertit des longitudes/latitudes en points de la sphère unité, pour des distances de KD-tree
+    valables à toutes les latitudes.
+    """
+    import numpy as np
+
+    lon, lat = np.radians(longitudes), np.radians(latitudes)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def poids_regionaux(longitudes, latitudes, france, methode="idw", k=4, puissance=2, pas_echantillons=0.05, cache_dir=None):
+    """
+    Construit la matrice creuse des poids qui agrège les séries des points de grille en séries régionales.
+
+    Parameters:
+    -----------
+    longitudes, latitudes : array-like
+        Coordonnées des points de grille dont on dispose des séries (celles renvoyées par l'API).
+    france : geopandas.GeoDataFrame ou IndexRegions
+        Régions avec géométries.
+    methode : str
+        - 'idw' : chaque échantillon de la région est rattaché à ses `k` points de grille les plus
+          proches, pondérés par l'inverse de la distance à la puissance `puissance` ;
+        - 'aire' : chaque échantillon est rattaché à son point de grille le plus proche, ce qui
+          pondère chaque point par la part de surface de la région qu'il représente.
+    k : int
+        Nombre de voisins en mode 'idw'.
+    puissance : float
+        Exposant de l'inverse de la distance.
+    pas_echantillons : float
+        Pas en degrés des échantillons régulièrement répartis dans chaque région.
+    cache_dir : str, optional
+        Dossier où la matrice est mise en cache (format .npz de scipy.sparse).
+
+    Returns:
+    --------
+    tuple (scipy.sparse.csr_matrix, numpy.ndarray)
+        Matrice (n_regions × n_points) dont chaque ligne somme à 1, et noms des régions (ordre des lignes).
+
+    Notes:
+    ------
+    - Les plus proches voisins sont cherchés avec un KD-tree sur les coordonnées ramenées sur la
+      sphère unité. La ligne d'une région est la moyenne des poids de ses échantillons.
+    """
+    import hashlib
+    import os
+    import numpy as np
+    from scipy import sparse
+    from scipy.spatial import cKDTree
+    from .spatial import IndexRegions
+
+    index = france if isinstance(france, IndexRegions) else IndexRegions(france)
+    longitudes = np.asarray(longitudes, dtype=float)
+    latitudes = np.asarray(latitudes, dtype=float)
+    k = 1 if methode == "aire" else min(k, len(longitudes))
+
+    chemin = None
+    if cache_dir is not None:
+        empreinte = hashlib.sha1(longitudes.tobytes() + latitudes.tobytes())
+        empreinte.update(f"{index.empreinte}|{methode}|{k}|{puissance}|{pas_echantillons}".encode())
+        chemin = os.path.join(cache_dir, f"poids_{empreinte.hexdigest()}.npz")
+        if os.path.exists(chemin):
+            return sparse.load_npz(chemin), index.regions
+
+    echantillons = grille_regions(index, pas=pas_echantillons)
+    positions = echantillons["region"].map({region: i for i, region in enumerate(index.regions)}).to_numpy()
+
+    arbre = cKDTree(_coordonnees_3d(longitudes, latitudes))
+    distances, voisins = arbre.query(
+        _coordonnees_3d(echantillons["longitude"].to_numpy(), echantillons["latitude"].to_numpy()), k=k
+    )
+    distances, voisins = distances.reshape(len(echantillons), k), voisins.reshape(len(echantillons), k)
+    if methode == "aire":
+        poids = np.ones_like(distances)
+    else:
+        poids = 1 / np.maximum(distances, 1e-12) ** puissance
+    poids /= poids.sum(axis=1, keepdims=True)
+
+    # Chaque échantillon contribue 1 / (nombre d'échantillons de sa région) à la ligne de sa région
+    n_echantillons = np.bincount(positions, minlength=len(index.regions))
+    poids /= n_echantillons[positions][:, None]
+    matrice = sparse.csr_matrix(
+        (poids.ravel(), (np.repeat(positions, k), voisins.ravel())),
+        shape=(len(index.regions), len(longitudes)),
+    )
+    matrice.sum_duplicates()
+
+    if chemin is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        sparse.save_npz(chemin, matrice)
+    return matrice, index.regions
+
+
+def agreger_grille(valeurs, poids):
+    """
+    Agrège des valeurs de points de grille en valeurs régionales par un produit matriciel creux.
+
+    Parameters:
+    -----------
+    valeurs : numpy.ndarray
+        Tableau (n_points, ...) de valeurs aux points de grille (les NaN sont ignorés).
+    poids : scipy.sparse matrix
+        Matrice (n_regions × n_points) de `poids_regionaux`.
+
+    Returns:
+    --------
+    numpy.ndarray
+        Tableau (n_regions, ...) des moyennes pondérées, renormalisées sur les points disponibles.
+    """
+    import numpy as np
+
+    forme = valeurs.shape
+    plat = valeurs.reshape(forme[0], -1)
+    disponibles = ~np.isnan(plat)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        agrege = (poids @ np.where(disponibles, plat, 0)) / (poids @ disponibles.astype(float))
+    return agrege.reshape((poids.shape[0],) + forme[1:])
+
+
+def recup_data_grille(start_date, end_date, url, variables, france, pas=0.25, methode="idw", k=4, taille_lot=50, cache_dir=".cache_grille", metriques=False):
+    """
+    Récupère des données horaires sur une grille de points par région et les agrège en séries régionales.
+
+    Parameters:
+    -----------
+    start_date, end_date : str
+        Dates de début et de fin au format 'YYYY-MM-DD'.
+    url : str
+        Lien de l'API météo (ou qualité de l'air) utilisée pour les requêtes.
+    variables : list
+        Liste des variables horaires à récupérer.
+    france : geopandas.GeoDataFrame ou IndexRegions
+        Régions avec géométries.
+    pas : float
+        Pas en degrés de la grille de points interrogés (par défaut 0.25°).
+    methode, k :
+        Pondération des points de grille (voir `poids_regionaux`).
+    taille_lot : int
+        Nombre de points interrogés par requête (l'API accepte plusieurs coordonnées à la fois).
+    cache_dir : str or None
+        Dossier du cache des matrices de poids.
+    metriques : bool or MetriquesIO
+        Comme pour `recup_data`. Une requête portant sur plusieurs régions, les métriques sont
+        attribuées au lot de points ('points 0-49', ...) plutôt qu'à une région.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Même format que `recup_data` ('date', 'day', 'region', 'longitude', 'latitude' du centroïde
+        de la région, puis une colonne par variable), directement utilisable par `atmo`.
+    MetriquesIO
+        Uniquement si `metriques` est activé : renvoie le couple (DataFrame, MetriquesIO).
+
+    Description:
+    ------------
+    1. Échantillonne les points de grille de chaque région (`grille_regions`).
+    2. Interroge l'API par lots de points ; les coordonnées réellement servies par l'API
+       (recalées sur sa grille de modèle) sont conservées.
+    3. Construit (ou relit depuis le cache) la matrice creuse des poids régionaux.
+    4. Agrège toutes les heures et toutes les variables en un seul produit matriciel creux.
+
+    Notes:
+    ------
+    - Un lot en échec est signalé et ignoré ; si tous les lots échouent, une RuntimeError liste
+      les lots concernés.
+    """
+    import numpy as np
+    import pandas as pd
+    import requests_cache
+    from retry_requests import retry
+    from openmeteo_requests import Client
+    from .spatial import IndexRegions
+
+    index = france if isinstance(france, IndexRegions) else IndexRegions(france)
+    points = grille_regions(index, pas=pas)
+
+    cache_session = requests_cache.CachedSession(backend="memory", expire_after=3600)
+    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
+    if metriques is True:
+        metriques = MetriquesIO()
+    if metriques:
+        metriques.envelopper(retry_session)
+    openmeteo = Client(session=retry_session)
+
+    series, longitudes, latitudes = [], [], []
+    dates = None
+    echecs = []
+    for debut in range(0, len(points), taille_lot):
+        lot = points.iloc[debut:debut + taille_lot]
+        nom_lot = f"points {debut}-{debut + len(lot) - 1}"
+        if metriques:
+            metriques.region = nom_lot
+        params = {
+            "latitude": lot["latitude"].tolist(),
+            "longitude": lot["longitude"].tolist(),
+            "hourly": variables,
+            "start_date": start_date,
+            "end_date": end_date
+        }
+        try:
+            responses = openmeteo.weather_api(url, params=params)
+        except Exception as e:
+            print(f"Erreur lors de la récupération des points {debut} à {debut + len(lot) - 1}: {e}")
+            echecs.append(f"{nom_lot} ({e})")
+            continue
+        for response in responses:
+            hourly = response.Hourly()
+            if dates is None:
+                dates = pd.date_range(
+                    start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
+                    end=pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True),
+                    freq=pd.Timedelta(seconds=hourly.Interval()),
+                    inclusive="left"
+                )
+            series.append(np.column_stack([hourly.Variables(i).ValuesAsNumpy() for i in range(len(variables))]))
+            longitudes.append(response.Longitude())
+            latitudes.append(response.Latitude())
 
+    if not series:
+        raise RuntimeError(f"Aucun point de grille récupéré du {start_date} au {end_date}, lots en échec : {'; '.join(echecs)}")
+    valeurs = np.stack(series)  # (n_points, n_heures, n_variables)
+    poids, regions = poids_regionaux(longitudes, latitudes, index, methode=methode, k=k, cache_dir=cache_dir)
+    regionales = agreger_grille(valeurs, poids)  # (n_regions, n_heures, n_variables)
 
-    return combined_dataframe
\ No newline at end of file
+    centroides = {region: (lon, lat) for region, lon, lat in index.centroides()}
+    n_regions, n_heures = regionales.shape[:2]
+    combined_dataframe = pd.DataFrame({
+        "date": dates[np.tile(np.arange(n_heures), n_regions)],
+        "region": np.repeat(regions, n_heures),
+        "longitude": np.repeat([centroides[region][0] for region in regions], n_heures),
+        "latitude": np.repeat([centroides[region][1] for region in regions], n_heures),
+    })
+    for i, variable in enumerate(variables):
+        combined_dataframe[variable] = regionales[:, :, i].ravel()
+    combined_dataframe.insert(1, "day", combined_dataframe["date"].dt.date)
+    if metriques:
+        return combined_dataframe, metriques
+    return combined_dataframe
@@ -0,0 +1,69 @@
+"""
+Mesure du temps d'import du package et contrôle des dépendances chargées.
+
+Usage : python -m scripts.bench_import [--seuil 0.2] [--repetitions 5]
+
+Chaque mesure est faite dans un interpréteur neuf. Le script échoue (code de sortie 1) si
+`import scripts` suivi de l'accès aux fonctions de `indice` charge une dépendance lourde, ou si
+le temps médian dépasse `--seuil` secondes.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Dépendances qui ne doivent pas être chargées par `import scripts` ni par les fonctions de `indice`
+DEPENDANCES_LOURDES = [
+    "pandas", "numpy", "scipy", "statsmodels", "sklearn", "matplotlib", "seaborn",
+    "geopandas", "shapely", "openmeteo_requests", "requests_cache", "retry_requests",
+]
+
+_PROGRAMME = """
+import json, sys, time
+debut = time.perf_counter()
+import scripts
+from scripts import atmo, get_subindex_pm10, get_subindex_o3
+duree = time.perf_counter() - debut
+print(json.dumps({"duree": duree, "charges": [m for m in %r if m in sys.modules]}))
+""" % (DEPENDANCES_LOURDES,)
+
+
+def mesurer_import(repetitions=5):
+    """
+    Mesure `repetitions` fois le temps d'import dans un interpréteur neuf.
+
+    Returns:
+    --------
+    dict
+        'median_s', 'min_s', 'max_s' et 'charges' (dépendances lourdes chargées par l'import).
+    """
+    durees = []
+    charges = set()
+    for _ in range(repetitions):
+        sortie = subprocess.run(
+            [sys.executable, "-c", _PROGRAMME], capture_output=True, text=True, check=True
+        ).stdout
+        mesure = json.loads(sortie.strip().splitlines()[-1])
+        durees.append(mesure["duree"])
+        charges.update(mesure["charges"])
+    return {
+        "median_s": statistics.median(durees),
+        "min_s": min(durees),
+        "max_s": max(durees),
+        "charges": sorted(charges),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seuil", type=float, default=0.2, help="Temps médian maximal en secondes")
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    resultat = mesurer_import(args.repetitions)
+    print(json.dumps(resultat, indent=2))
+    if resultat["charges"]:
+        sys.exit(f"Régression : dépendances lourdes chargées à l'import : {resultat['charges']}")
+    if resultat["median_s"] > args.seuil:
+        sys.exit(f"Régression : import en {resultat['median_s']:.3f} s (seuil {args.seuil} s)")
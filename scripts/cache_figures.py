@@ -0,0 +1,203 @@
+"""
+Cache disque des figures : une figure déjà rendue pour la même tranche de données et les mêmes
+paramètres est réaffichée depuis son image au lieu d'être retracée.
+
+Activation :
+- variable d'environnement SCRIPTS_CACHE_FIGURES=dossier (taille maximale en octets dans
+  SCRIPTS_CACHE_FIGURES_MAX, 500 Mo par défaut) ;
+- ou `configurer_cache_figures("dossier")`.
+
+Désactivé (par défaut), les fonctions de tracé s'exécutent sans changement.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+
+# Version du rendu : à incrémenter lorsque le style des figures change, pour invalider le cache
+VERSION_RENDU = 2
+
+_CONFIG = {
+    "dossier": os.environ.get("SCRIPTS_CACHE_FIGURES") or None,
+    "taille_max": int(os.environ.get("SCRIPTS_CACHE_FIGURES_MAX", 500 * 2 ** 20)),
+    "dpi": 100,
+}
+
+# Backends matplotlib sans fenêtre, pour lesquels `plt.show` n'affiche rien
+_BACKENDS_FICHIERS = {"agg", "cairo", "pdf", "pgf", "ps", "svg", "template"}
+
+
+def configurer_cache_figures(dossier=".cache_figures", taille_max=500 * 2 ** 20, dpi=100):
+    """
+    Active (ou désactive avec `dossier=None`) le cache des figures.
+
+    Parameters:
+    -----------
+    dossier : str or None
+        Dossier des images en cache (créé si nécessaire). None désactive le cache.
+    taille_max : int
+        Taille maximale du dossier en octets ; au-delà, les images les moins récemment utilisées
+        sont supprimées.
+    dpi : int
+        Résolution des images enregistrées.
+    """
+    _CONFIG.update(dossier=dossier, taille_max=taille_max, dpi=dpi)
+
+
+def vider_cache_figures():
+    """
+    Supprime toutes les images du cache configuré.
+    """
+    dossier = _CONFIG["dossier"]
+    if dossier is None or not os.path.isdir(dossier):
+        return
+    for nom in os.listdir(dossier):
+        if nom.endswith(".png"):
+            os.remove(os.path.join(dossier, nom))
+
+
+def _empreinte_objet(h, objet):
+    """
+    Ajoute à `h` le contenu d'un DataFrame, d'une Series, d'un GeoDataFrame ou d'un `CacheGeometrie`.
+    """
+    import pandas as pd
+    from .geometrie import CacheGeometrie
+
+    if isinstance(objet, CacheGeometrie):
+        h.update(repr((str(objet.crs_origine), objet.tolerances, str(objet.crs))).encode())
+        objet = objet._origine
+    if isinstance(objet, pd.Series):
+        objet = objet.to_frame()
+    h.update(pd.util.hash_pandas_object(objet.index).to_numpy().tobytes())
+    for colonne, serie in objet.items():
+        h.update(repr((colonne, str(serie.dtype))).encode())
+        if str(serie.dtype) == "geometry":
+            import shapely
+            h.update(b"".join(shapely.to_wkb(serie.to_numpy())))
+        else:
+            h.update(pd.util.hash_pandas_object(serie, index=False).to_numpy().tobytes())
+
+
+def empreinte_figure(nom, donnees, params):
+    """
+    Calcule la clé de cache d'une figure.
+
+    Parameters:
+    -----------
+    nom : str
+        Nom de la fonction de tracé.
+    donnees : list
+        Tranches de données effectivement tracées (DataFrame, Series, GeoDataFrame, CacheGeometrie).
+    params : dict
+        Paramètres de tracé (sérialisables en JSON ou par `repr`).
+    """
+    h = hashlib.sha1(f"{nom}|{VERSION_RENDU}|{_CONFIG['dpi']}".encode())
+    for objet in donnees:
+        _empreinte_objet(h, objet)
+    h.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    return h.hexdigest()
+
+
+def _evincer(dossier, taille_max):
+    """
+    Supprime les images les moins récemment utilisées (date de modification) tant que le dossier
+    dépasse `taille_max` octets.
+    """
+    images = []
+    for entree in os.scandir(dossier):
+        if entree.name.endswith(".png"):
+            stat = entree.stat()
+            images.append((stat.st_mtime, stat.st_size, entree.path))
+    total = sum(taille for _, taille, _ in images)
+    for _, taille, chemin in sorted(images):
+        if total <= taille_max:
+            break
+        try:
+            os.remove(chemin)
+        except FileNotFoundError:
+            pass
+        total -= taille
+
+
+def _afficher(chemin):
+    """
+    Affiche une image en cache : dans le notebook si IPython est actif, sinon dans une figure.
+    """
+    import sys
+
+    ipython = sys.modules.get("IPython")
+    if ipython is not None and ipython.get_ipython() is not None:
+        from IPython.display import Image, display
+        display(Image(filename=chemin))
+        return
+    import matplotlib.pyplot as plt
+
+    if plt.get_backend().lower() in _BACKENDS_FICHIERS:
+        # Rendu sans affichage (scripts, processus de rapport) : l'image en cache suffit
+        return
+    image = plt.imread(chemin)
+    fig = plt.figure(figsize=(image.shape[1] / _CONFIG["dpi"], image.shape[0] / _CONFIG["dpi"]), dpi=_CONFIG["dpi"])
+    fig.figimage(image)
+    plt.show()
+
+
+def figure_en_cache(tranche):
+    """
+    Décorateur : met en cache l'image produite par une fonction de tracé qui se termine par `plt.show()`.
+
+    Parameters:
+    -----------
+    tranche : callable
+        Reçoit le dictionnaire des arguments de l'appel (valeurs par défaut comprises) et renvoie
+        (liste des tranches de données tracées, dict des autres paramètres). Seules ces tranches
+        entrent dans la clé : une modification des données hors de la tranche ne force pas le rendu.
+
+    Notes:
+    ------
+    - Sur un défaut de cache, `plt.show` est remplacé le temps de l'appel pour enregistrer la figure
+      courante dans le cache avant de l'afficher.
+    - Sur un succès, la fonction n'est pas appelée : l'image est affichée et sa date de
+      modification mise à jour (éviction LRU).
+    - La clé est calculée avant l'appel, donc avant toute modification des données par la fonction.
+    """
+    def decorateur(fonction):
+        signature = inspect.signature(fonction)
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            dossier = _CONFIG["dossier"]
+            if dossier is None:
+                return fonction(*args, **kwargs)
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            donnees, params = tranche(arguments.arguments)
+            chemin = os.path.join(dossier, f"{fonction.__name__}_{empreinte_figure(fonction.__name__, donnees, params)}.png")
+
+            if os.path.exists(chemin):
+                os.utime(chemin)
+                _afficher(chemin)
+                return None
+
+            import matplotlib.pyplot as plt
+
+            os.makedirs(dossier, exist_ok=True)
+            show = plt.show
+
+            def show_en_cache(*args_show, **kwargs_show):
+                plt.gcf().savefig(chemin + ".tmp", format="png", dpi=_CONFIG["dpi"], bbox_inches="tight")
+                os.replace(chemin + ".tmp", chemin)
+                return show(*args_show, **kwargs_show)
+
+            plt.show = show_en_cache
+            try:
+                resultat = fonction(*args, **kwargs)
+            finally:
+                plt.show = show
+            if os.path.exists(chemin):
+                _evincer(dossier, _CONFIG["taille_max"])
+            return resultat
+
+        return enveloppe
+
+    return decorateur
@@ -1,5 +1,150 @@
+from .cache_figures import figure_en_cache
+from .instrumentation import instrumenter, phase
+
+
+def _tranche_time_series_regions(arguments):
+    import pandas as pd
+
+    df = arguments["df_final"]
+    polluants = list(arguments["polluants"])
+    # Les jours sont normalisés : une colonne 'day' en texte ou en dates donne la même clé
+    donnees = df[['day', 'region'] + polluants].assign(day=pd.to_datetime(df['day']))
+    return [donnees], {"polluants": polluants, "max_points": arguments["max_points"], "methode": arguments["methode"]}
+
+
+def _tranche_plot_monthly_averages(arguments):
+    variables = list(arguments["variables"])
+    return [arguments["df"][variables]], {"variables": variables}
+
+
+def _tranche_plot_pollutants(arguments):
+    gd = arguments["gd"]
+    colonnes = [arguments["region_label_col"], gd.geometry.name] + list(arguments["pollutants"])
+    params = {cle: valeur for cle, valeur in arguments.items() if cle not in ("gd", "cache")}
+    params["crs"] = str(gd.crs)
+    # Les points d'étiquetage dépendent des géométries d'origine du cache
+    donnees = [gd[colonnes]] + ([arguments["cache"]] if arguments["cache"] is not None else [])
+    return donnees, params
+
+
+def _tranche_plot_indice_atmo(arguments):
+    from .geometrie import CacheGeometrie
+
+    data = arguments["data"]
+    # Même filtre que la fonction : seules les valeurs du jour tracé entrent dans la clé
+    jour = data.loc[data['day'] == arguments["date"], ['region', 'indice_atmo']]
+    geo = arguments["france_geo"]
+    params = {"date": str(arguments["date"]), "niveau": arguments["niveau"]}
+    if not isinstance(geo, CacheGeometrie):
+        params["crs"] = str(geo.crs)
+        geo = geo[["LIBELLE_REGION", geo.geometry.name]]
+    return [jour, geo], params
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Sous-échantillonnage Largest-Triangle-Three-Buckets : renvoie les indices de `n_out` points
+    conservant la forme visuelle de la série (x croissant, sans valeurs manquantes).
+    """
+    import numpy as np
+
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 seaux intermédiaires ; le premier et le dernier point sont toujours conservés
+    bords = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        debut, fin = bords[i], bords[i + 1]
+        if i + 2 < len(bords):
+            x_moy, y_moy = x[fin:bords[i + 2]].mean(), y[fin:bords[i + 2]].mean()
+        else:
+            x_moy, y_moy = x[-1], y[-1]
+        # Aire du triangle formé par le point retenu précédent, chaque candidat et la moyenne du seau suivant
+        aires = np.abs((x[a] - x_moy) * (y[debut:fin] - y[a]) - (x[a] - x[debut:fin]) * (y_moy - y[a]))
+        a = debut + int(np.argmax(aires))
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_indices(x, y, n_out):
+    """
+    Sous-échantillonnage min/max par seaux : renvoie les indices du minimum et du maximum de chaque
+    seau (environ `n_out` points), ce qui conserve les pics de la série. Les valeurs manquantes
+    sont ignorées ; un seau sans aucune valeur ne donne aucun point.
+    """
+    import numpy as np
+
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    taille = -(-n // (n_out // 2))
+    n_seaux = -(-n // taille)
+    seaux = np.full(n_seaux * taille, np.nan)
+    seaux[:n] = y
+    seaux = seaux.reshape(n_seaux, taille)
+    decalages = np.arange(n_seaux) * taille
+    # Les seaux entièrement manquants (trous dans les données) n'ont ni minimum ni maximum
+    pleins = ~np.isnan(seaux).all(axis=1)
+    seaux, decalages = seaux[pleins], decalages[pleins]
+    indices = np.concatenate([
+        [0, n - 1],
+        decalages + np.nanargmin(seaux, axis=1),
+        decalages + np.nanargmax(seaux, axis=1),
+    ])
+    return np.unique(indices)
+
+
+def _plot_downsampled(ax, x, y, max_points="auto", methode="minmax", **kwargs):
+    """
+    Trace une série sous-échantillonnée à environ `max_points` points (par défaut, la largeur de
+    l'axe en pixels). Les données complètes restent attachées à la courbe : à chaque zoom, la
+    portion visible est sous-échantillonnée de nouveau à partir des données brutes.
+    """
+    import numpy as np
+    import pandas as pd
+    import matplotlib.dates as mdates
+
+    x = pd.Index(x)
+    est_date = not pd.api.types.is_numeric_dtype(x)
+    x = mdates.date2num(pd.to_datetime(x)) if est_date else np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valides = ~np.isnan(y)
+    x, y = x[valides], y[valides]
+    ordre = np.argsort(x, kind="stable")
+    x, y = x[ordre], y[ordre]
+
+    if max_points is None:
+        ligne, = ax.plot(x, y, **kwargs)
+    else:
+        selection = lttb_indices if methode == "lttb" else minmax_indices
+
+        def n_points():
+            return int(ax.get_window_extent().width) if max_points == "auto" else max_points
+
+        indices = selection(x, y, n_points())
+        ligne, = ax.plot(x[indices], y[indices], **kwargs)
+
+        def sur_zoom(ax):
+            xmin, xmax = ax.get_xlim()
+            debut = max(np.searchsorted(x, xmin) - 1, 0)
+            fin = min(np.searchsorted(x, xmax) + 1, len(x))
+            indices = debut + selection(x[debut:fin], y[debut:fin], n_points())
+            ligne.set_data(x[indices], y[indices])
+
+        ax.callbacks.connect("xlim_changed", sur_zoom)
+
+    if est_date:
+        ax.xaxis_date()
+    return ligne
+
+
     
-def time_series_france(polluants: list, time_trends_2023, time_trends_2024):
+def time_series_france(polluants: list, time_trends_2023, time_trends_2024, max_points="auto", methode="minmax"):
     """
     Trace une comparaison des évolutions moyennes journalières de plusieurs
     polluants atmosphériques pour l’année 2023 et l’année 2024.
@@ -14,6 +159,11 @@ def time_series_france(polluants: list, time_trends_2023, time_trends_2024):
     time_trends_2024 : pandas.DataFrame ou pandas.Series
         Données de concentrations moyennes journalières des polluants pour 2024.
         Doit avoir au moins autant de colonnes (ou un index) que la liste `polluants`.
+    max_points : int, "auto" ou None
+        Nombre de points tracés par courbe ("auto" : largeur de l’axe en pixels,
+        None : toutes les données). Les données brutes sont réutilisées lors d’un zoom.
+    methode : str
+        Sous-échantillonnage : "minmax" (par défaut, entièrement vectorisé) ou "lttb".
 
     Le code génère un graphique unique avec :
       - Les courbes pour 2023 (ligne pleine),
@@ -29,26 +179,31 @@ def time_series_france(polluants: list, time_trends_2023, time_trends_2024):
 
     sns.set_theme(style="whitegrid")
     plt.figure(figsize=(12, 6))
+    couleurs = sns.color_palette("tab10", n_colors=len(polluants))
 
     # Traçage des tendances pour 2023
-    time_trends_2023.plot(
-        ax=plt.gca(),
-        linewidth=1,
-        linestyle="-",  # Ligne pleine pour 2023
-        alpha=0.7,
-        color=sns.color_palette("tab10", n_colors=len(polluants)),
-        label=[f"{pollutant} (2023)" for pollutant in polluants]
-    )
+    trends = pd.DataFrame(time_trends_2023)
+    for couleur, pollutant, column in zip(couleurs, polluants, trends.columns):
+        _plot_downsampled(
+            plt.gca(), trends.index, trends[column], max_points, methode,
+            linewidth=1,
+            linestyle="-",  # Ligne pleine pour 2023
+            alpha=0.7,
+            color=couleur,
+            label=f"{pollutant} (2023)"
+        )
 
     # Traçage des tendances pour 2024
-    time_trends_2024.plot(
-        ax=plt.gca(),
-        linewidth=1.5,
-        linestyle="--",  # Ligne pointillée pour 2024
-        alpha=0.9,
-        color=sns.color_palette("tab10", n_colors=len(polluants)),
-        label=[f"{pollutant} (2024)" for pollutant in polluants]
-    )
+    trends = pd.DataFrame(time_trends_2024)
+    for couleur, pollutant, column in zip(couleurs, polluants, trends.columns):
+        _plot_downsampled(
+            plt.gca(), trends.index, trends[column], max_points, methode,
+            linewidth=1.5,
+            linestyle="--",  # Ligne pointillée pour 2024
+            alpha=0.9,
+            color=couleur,
+            label=f"{pollutant} (2024)"
+        )
 
     plt.title("📈 Tendances temporelles des polluants atmosphériques (2023 vs 2024)", fontsize=16)
     plt.xlabel("Jour", fontsize=14)
@@ -61,7 +216,8 @@ def time_series_france(polluants: list, time_trends_2023, time_trends_2024):
     plt.show()
 
 
-def time_series_regions(polluants, df_final):
+@figure_en_cache(_tranche_time_series_regions)
+def time_series_regions(polluants, df_final, max_points="auto", methode="minmax"):
     
     """
     Trace, pour chaque région, l'évolution moyenne journalière 
@@ -76,25 +232,31 @@ def time_series_regions(polluants, df_final):
           - 'day' (date ou chaîne de caractères représentant la date)
           - 'region' (nom de la région)
           - et pour chaque polluant de la liste `polluants`.
+    max_points : int, "auto" ou None
+        Nombre de points tracés par courbe ("auto" : largeur de l'axe en pixels,
+        None : toutes les données). Les données brutes sont réutilisées lors d'un zoom.
+    methode : str
+        Sous-échantillonnage : "minmax" (par défaut, entièrement vectorisé) ou "lttb".
     """
 
     import pandas as pd
     import matplotlib.pyplot as plt
     import seaborn as sns
-    df_final['day'] = pd.to_datetime(df_final['day'])
+    # Copie locale : ni la colonne 'day' de l'appelant ni le style global ne sont modifiés
+    df_final = df_final.assign(day=pd.to_datetime(df_final['day']))
     time_trends_reg = df_final.groupby(['day', 'region'])[polluants].mean().reset_index()
     regions = time_trends_reg['region'].unique()
-        # Configuration du style seaborn
-    sns.set_theme(style="whitegrid")
+    # Style seaborn appliqué à cette figure uniquement
+    with sns.axes_style("whitegrid"):
         # Création de la grille de sous-graphiques (2 colonnes, et assez de lignes pour toutes les régions)
-    fig, axes = plt.subplots(
+        fig, axes = plt.subplots(
             nrows=(len(regions) + 1) // 2,
             ncols=2,
             figsize=(20, len(regions) * 3)
         )
-    axes = axes.flatten()
+        axes = axes.flatten()
         # Boucle sur chaque région pour tracer les courbes
-    for i, region in enumerate(regions):
+        for i, region in enumerate(regions):
             region_data = time_trends_reg[time_trends_reg['region'] == region]
 
             time_trends_2023 = region_data[
@@ -106,26 +268,29 @@ def time_series_regions(polluants, df_final):
                 (region_data['day'] <= pd.to_datetime('2024-12-31'))
             ]
             #Tendance pour 2023
+            couleurs = sns.color_palette("tab10", n_colors=len(polluants))
             if not time_trends_2023.empty:
-                time_trends_2023.set_index('day')[polluants].plot(
-                    ax=axes[i],
-                    linewidth=1,
-                    linestyle="-",
-                    alpha=0.7,
-                    color=sns.color_palette("tab10", n_colors=len(polluants)),
-                    label=[f"{pollutant} (2023)" for pollutant in polluants]
-                )
+                for couleur, pollutant in zip(couleurs, polluants):
+                    _plot_downsampled(
+                        axes[i], time_trends_2023['day'], time_trends_2023[pollutant], max_points, methode,
+                        linewidth=1,
+                        linestyle="-",
+                        alpha=0.7,
+                        color=couleur,
+                        label=f"{pollutant} (2023)"
+                    )
 
             # Tendance pour 2024
             if not time_trends_2024.empty:
-                time_trends_2024.set_index('day')[polluants].plot(
-                    ax=axes[i],
-                    linewidth=1.5,
-                    linestyle="--",
-                    alpha=0.9,
-                    color=sns.color_palette("tab10", n_colors=len(polluants)),
-                    label=[f"{pollutant} (2024)" for pollutant in polluants]
-                )
+                for couleur, pollutant in zip(couleurs, polluants):
+                    _plot_downsampled(
+                        axes[i], time_trends_2024['day'], time_trends_2024[pollutant], max_points, methode,
+                        linewidth=1.5,
+                        linestyle="--",
+                        alpha=0.9,
+                        color=couleur,
+                        label=f"{pollutant} (2024)"
+                    )
 
             # Personnalisation des axes et de la légende
             axes[i].set_title(f"Tendances des polluants ({region})", fontsize=14)
@@ -136,18 +301,19 @@ def time_series_regions(polluants, df_final):
             axes[i].legend(fontsize=10)
 
         # Supprimer les axes non utilisés si le nombre de régions est impair
-    for j in range(len(regions), len(axes)):
+        for j in range(len(regions), len(axes)):
             fig.delaxes(axes[j])
 
         # Ajustement global de l'affichage
-    plt.tight_layout()
-    plt.show()
+        plt.tight_layout()
+        plt.show()
 
 
 
 
 
 
+@figure_en_cache(_tranche_plot_monthly_averages)
 def plot_monthly_averages(df, variables):
     """
     Affiche pour chaque variable (polluant) la moyenne mensuelle sous forme de graphiques,
@@ -205,6 +371,7 @@ def plot_monthly_averages(df, variables):
 
 
 
+@figure_en_cache(_tranche_plot_pollutants)
 def plot_pollutants(
     gd,
     pollutants,
@@ -213,7 +380,8 @@ def plot_pollutants(
     cmap='Greys',
     title_prefix="Carte de chaleur",
     xlim=None,
-    ylim=None
+    ylim=None,
+    cache=None
 ):
     """
     Affichage de plusieurs cartes choroplèthes (une par polluant) 
@@ -244,6 +412,10 @@ def plot_pollutants(
     ylim : tuple or None
         Limites de l'axe Y sous la forme (ymin, ymax). 
         Si None, la limite est déduite des données.
+    cache : CacheGeometrie or None
+        Cache de géométries (voir `obtenir_cache_geometrie`) dont les points 
+        d'étiquetage sont réutilisés. Si None, le cache associé aux géométries
+        de `gd` est utilisé (construit au premier appel).
     """
     import geopandas as gpd
     import matplotlib.pyplot as plt
@@ -273,6 +445,13 @@ def plot_pollutants(
     else:
         axes = [axes]
 
+    # Points d'étiquetage des régions, calculés une fois pour toutes les cartes et tous les appels
+    if cache is None:
+        from .geometrie import obtenir_cache_geometrie
+        cache = obtenir_cache_geometrie(gd, region_col=region_label_col)
+    labels = cache.points_labels(gd.crs).reindex(gd[region_label_col])
+    labels = list(zip(labels.x, labels.y, gd[region_label_col]))
+
     # Boucle sur chaque polluant et chaque axe
     for i, pollutant in enumerate(pollutants):
         ax = axes[i]
@@ -307,12 +486,11 @@ def plot_pollutants(
         ax.set_title(f"{title_prefix} : {pollutant}", fontsize=18)
 
         # Ajout des labels de région au centroïde de chaque géométrie
-        for idx, row in gd.iterrows():
-            centroid = row['geometry'].centroid
+        for x, y, label in labels:
             ax.text(
-                centroid.x,
-                centroid.y,
-                row[region_label_col],
+                x,
+                y,
+                label,
                 fontsize=10,
                 ha='center',
                 color='black',
@@ -335,7 +513,65 @@ def plot_pollutants(
 
 
 
-def plot_climatic_histograms(df, var_climat, n_cols=3, width=20, height_per_row=5):
+def resume_histogramme(valeurs, bins=50, sur_echantillonnage=16):
+    """
+    Résume une variable en un histogramme et une densité à noyau gaussien (KDE) calculés sur
+    une grille, en une seule passe sur les données.
+
+    Paramètres
+    ----------
+    valeurs : array-like
+        Valeurs de la variable (les valeurs manquantes sont ignorées).
+    bins : int
+        Nombre de barres de l'histogramme (par défaut 50).
+    sur_echantillonnage : int
+        Nombre de cases de la grille fine par barre, sur laquelle la KDE est calculée.
+
+    Retour
+    ------
+    dict
+        'bords' (bornes des barres), 'comptes' (effectifs des barres), 'x' (centres de la grille
+        fine), 'kde' (densité exprimée en effectif par barre, comme seaborn) et 'n'.
+
+    Les valeurs sont réparties sur une grille fine par un unique `np.histogram` ; la KDE est la
+    convolution (par FFT) de ces effectifs avec un noyau gaussien de largeur fixée par la règle de
+    Scott, comme `gaussian_kde`. Le coût ne dépend plus du produit n × points de grille.
+    """
+    import numpy as np
+    from scipy.signal import fftconvolve
+
+    x = np.asarray(valeurs, dtype=float)
+    x = x[~np.isnan(x)]
+    n = len(x)
+    mini, maxi = (x.min(), x.max()) if n else (0.0, 1.0)
+    if maxi == mini:
+        mini, maxi = mini - 0.5, maxi + 0.5
+
+    n_fin = bins * sur_echantillonnage
+    fins, bords_fins = np.histogram(x, bins=n_fin, range=(mini, maxi))
+    comptes = fins.reshape(bins, sur_echantillonnage).sum(axis=1)
+    pas = bords_fins[1] - bords_fins[0]
+
+    # Noyau gaussien discrétisé sur la grille fine (règle de Scott : h = écart-type × n^(-1/5))
+    h = x.std() * n ** (-1 / 5) if n > 1 else 0.0
+    if h > 0:
+        demi_largeur = int(np.ceil(4 * h / pas))
+        noyau = np.exp(-0.5 * (np.arange(-demi_largeur, demi_largeur + 1) * pas / h) ** 2)
+        densite = fftconvolve(fins, noyau / noyau.sum(), mode="same").clip(min=0) / (max(n, 1) * pas)
+    else:
+        densite = fins / (max(n, 1) * pas)
+
+    largeur_barre = pas * sur_echantillonnage
+    return {
+        "bords": bords_fins[::sur_echantillonnage],
+        "comptes": comptes,
+        "x": (bords_fins[:-1] + bords_fins[1:]) / 2,
+        "kde": densite * n * largeur_barre,
+        "n": n,
+    }
+
+
+def plot_climatic_histograms(df, var_climat, n_cols=3, width=20, height_per_row=5, mode="auto", bins=50, resumes=None, seuil=100_000):
     """
     Trace un histogramme (avec kde) pour chaque variable indiquée dans var_climat.
     
@@ -351,6 +587,17 @@ def plot_climatic_histograms(df, var_climat, n_cols=3, width=20, height_per_row=
         Largeur (en pouces) de la figure globale (par défaut 20).
     height_per_row : int
         Hauteur (en pouces) par ligne de sous-graphiques (par défaut 5).
+    mode : str
+        "seaborn" (histplot sur toutes les lignes), "binned" (résumés calculés par
+        `resume_histogramme`) ou "auto" (par défaut) : "binned" au-delà de `seuil` lignes.
+    bins : int
+        Nombre de barres en mode "binned" (par défaut 50).
+    resumes : dict or None
+        Cache des résumés en mode "binned", indexé par (variable, bins, empreinte des valeurs).
+        Les résumés manquants y sont ajoutés, ce qui permet de réutiliser le même dictionnaire
+        d'un appel à l'autre : un autre `df` ou un autre `bins` donne une autre clé.
+    seuil : int
+        Nombre de lignes à partir duquel le mode "auto" passe en "binned".
     
     Retour
     ------
@@ -358,9 +605,16 @@ def plot_climatic_histograms(df, var_climat, n_cols=3, width=20, height_per_row=
         Affiche directement la figure des histogrammes.
     """
 
+    import hashlib
     import math
     import matplotlib.pyplot as plt
+    import pandas as pd
     import seaborn as sns
+    if mode == "auto":
+        mode = "binned" if len(df) > seuil else "seaborn"
+    if resumes is None:
+        resumes = {}
+
     # 1. Détermination du nombre de variables et calcul des dimensions de la grille
     n_vars = len(var_climat)
     n_rows = math.ceil(n_vars / n_cols)  # Arrondi pour couvrir tous les sous-graphiques nécessaires
@@ -380,8 +634,19 @@ def plot_climatic_histograms(df, var_climat, n_cols=3, width=20, height_per_row=
         axes = axes.flatten()
 
     # 4. Boucle pour tracer un histogramme pour chaque variable
+    couleur = sns.color_palette()[0]
     for i, variable in enumerate(var_climat):
-        sns.histplot(data=df, x=variable, kde=True, ax=axes[i])
+        if mode == "binned":
+            empreinte = hashlib.sha1(pd.util.hash_pandas_object(df[variable], index=False).to_numpy().tobytes())
+            cle = (variable, bins, empreinte.hexdigest())
+            if cle not in resumes:
+                resumes[cle] = resume_histogramme(df[variable], bins=bins)
+            resume = resumes[cle]
+            axes[i].stairs(resume["comptes"], resume["bords"], fill=True, color=couleur, alpha=0.5)
+            axes[i].stairs(resume["comptes"], resume["bords"], color=couleur, linewidth=0.5)
+            axes[i].plot(resume["x"], resume["kde"], color=couleur)
+        else:
+            sns.histplot(data=df, x=variable, kde=True, ax=axes[i])
         axes[i].set_title(f"Distribution de {variable}")
         axes[i].set_xlabel(variable)
         axes[i].set_ylabel("Fréquence")
@@ -395,17 +660,22 @@ def plot_climatic_histograms(df, var_climat, n_cols=3, width=20, height_per_row=
     plt.show()
 
 
-def plot_indice_atmo(data, france_geo, date):
+@instrumenter
+@figure_en_cache(_tranche_plot_indice_atmo)
+def plot_indice_atmo(data, france_geo, date, niveau=0):
     """
     Trace une carte des indices ATMO pour un jour donné.
 
     Parameters:
     - data (DataFrame): Contient les données avec les colonnes 'region', 'indice_atmo' et 'day'.
-    - france_geo (GeoDataFrame): GeoDataFrame des régions françaises avec géométries.
+    - france_geo (GeoDataFrame ou CacheGeometrie): Régions françaises avec géométries. Les géométries
+      projetées sont préparées une seule fois par GeoDataFrame (voir `obtenir_cache_geometrie`).
     - date (str): Date au format 'YYYY-MM-DD' pour laquelle tracer la carte.
+    - niveau (int): Niveau de simplification des géométries (0 : géométries complètes).
     """
     from matplotlib.colors import ListedColormap, BoundaryNorm
     import matplotlib.pyplot as plt
+    from .geometrie import obtenir_cache_geometrie
 
     # Définir les couleurs de l'indice ATMO
     atmo_colors = ListedColormap([
@@ -419,18 +689,12 @@ def plot_indice_atmo(data, france_geo, date):
     bounds = [1, 2.5, 4.5, 5.5, 7.5, 9.5, 10.5]
     norm = BoundaryNorm(bounds, atmo_colors.N)
 
-    # Filtrer les données pour la date spécifiée
-    data_filtered = data[data['day'] == date]
+    with phase("jointure"):
+        # Filtrer les données pour la date spécifiée
+        data_filtered = data[data['day'] == date]
 
-    # Renommer les colonnes pour la jointure
-    france_geo = france_geo.rename(columns={"LIBELLE_REGION": "region"})
-
-    # Jointure entre données géographiques et environnementales
-    france_atmo = france_geo.merge(data_filtered[['region', 'indice_atmo']], on='region', how='left')
-
-    # Transformer en EPSG:3857 si nécessaire
-    if france_atmo.crs.to_string() != "EPSG:3857":
-        france_atmo = france_atmo.to_crs(epsg=3857)
+        # Association des indices aux géométries déjà projetées en EPSG:3857
+        france_atmo = obtenir_cache_geometrie(france_geo).joindre(data_filtered, niveau=niveau)
 
     # Limites de la carte
     xmin, xmax = -0.75e6, 1.2e6  # Convertir les limites en mètres (EPSG:3857)
@@ -486,21 +750,24 @@ def plot_indice_atmo(data, france_geo, date):
 
 
 
-def plot_atmo_maps(df, france, start_date, end_date):
+@instrumenter
+def plot_atmo_maps(df, france, start_date, end_date, niveau=0):
     """
     Fonction pour tracer les cartes de l'Indice ATMO pour une plage de dates spécifique.
     
     Paramètres :
     - df : DataFrame contenant les données environnementales avec les colonnes ['region', 'day', 'indice_atmo'].
-    - france : GeoDataFrame contenant les données géographiques des régions françaises.
+    - france : GeoDataFrame (ou CacheGeometrie) contenant les données géographiques des régions françaises.
     - start_date : Début de la plage de dates (format 'AAAA-MM-JJ').
     - end_date : Fin de la plage de dates (format 'AAAA-MM-JJ').
+    - niveau : Niveau de simplification des géométries (0 : géométries complètes).
     """
 
     import matplotlib.patches as mpatches
     from matplotlib.colors import ListedColormap, BoundaryNorm
     import matplotlib.pyplot as plt
     import pandas as pd
+    from .geometrie import obtenir_cache_geometrie
     # Définir les couleurs et les bornes pour l'indice ATMO
     atmo_colors = ListedColormap([
         "#50F0E6",  # Très bon : Vert clair (Indice 1-2)
@@ -517,8 +784,8 @@ def plot_atmo_maps(df, france, start_date, end_date):
     dates_to_plot = pd.date_range(start=start_date, end=end_date)
     data_filtered = df[df['day'].isin(dates_to_plot)]
 
-    # Renommer la colonne pour correspondre à la carte géographique
-    france = france.rename(columns={"LIBELLE_REGION": "region"})
+    # Géométries projetées en EPSG:3857, préparées une seule fois
+    cache = obtenir_cache_geometrie(france)
 
     # Créer un subplot pour chaque jour
     n_rows = (len(dates_to_plot) + 3) // 4  # Calculer le nombre de lignes nécessaires
@@ -527,15 +794,7 @@ def plot_atmo_maps(df, france, start_date, end_date):
 
     # Pour chaque jour, tracer la carte correspondante
     for i, day in enumerate(dates_to_plot):
-        france_atmo = france.merge(
-            data_filtered[data_filtered['day'] == day][['region', 'indice_atmo']],
-            on='region', 
-            how='left'
-        )
-
-        # Vérifier et convertir le CRS au format EPSG:3857 si nécessaire
-        if france_atmo.crs.to_string() != "EPSG:3857":
-            france_atmo = france_atmo.to_crs(epsg=3857)
+        france_atmo = cache.joindre(data_filtered[data_filtered['day'] == day], niveau=niveau)
 
         # Définir les limites de la carte
         xmin, xmax = -0.75e6, 1.2e6
@@ -587,3 +846,237 @@ def plot_atmo_maps(df, france, start_date, end_date):
     plt.tight_layout()
     plt.show()
 
+
+
+def _style_atmo():
+    """
+    Palette, normalisation et légende de l'indice ATMO communes aux cartes produites en lot.
+    """
+    import matplotlib.patches as mpatches
+    from matplotlib.colors import ListedColormap, BoundaryNorm
+
+    legend_labels = [
+        ("Très bon", "#50F0E6"),
+        ("Bon", "#50CCAA"),
+        ("Moyen", "#F0E641"),
+        ("Médiocre", "#FF8000"),
+        ("Mauvais", "#FF0000"),
+        ("Très mauvais", "#7D2181")
+    ]
+    atmo_colors = ListedColormap([color for _, color in legend_labels])
+    norm = BoundaryNorm([1, 2.5, 4.5, 5.5, 7.5, 9.5, 10.5], atmo_colors.N)
+    legend_patches = [mpatches.Patch(color=color, label=label) for label, color in legend_labels]
+    return atmo_colors, norm, legend_patches
+
+
+# Contexte des processus de rendu : (cache de géométries, niveau, taille de figure, dpi)
+_CONTEXTE_RENDU = None
+
+
+def _initialiser_rendu(cache, niveau, figsize, dpi):
+    import multiprocessing
+
+    if multiprocessing.parent_process() is not None:
+        # Processus de travail : backend sans affichage. En série, les figures sont créées sans
+        # pyplot et le backend du processus courant reste inchangé.
+        import matplotlib
+        matplotlib.use("Agg")
+    global _CONTEXTE_RENDU
+    _CONTEXTE_RENDU = (cache, niveau, figsize, dpi)
+
+
+def _rendre_carte_jour(tache):
+    """
+    Rend la carte ATMO d'un jour dans un fichier, sans passer par pyplot.
+    """
+    import pandas as pd
+    from matplotlib.figure import Figure
+
+    titre, valeurs, chemin = tache
+    cache, niveau, figsize, dpi = _CONTEXTE_RENDU
+    atmo_colors, norm, legend_patches = _style_atmo()
+
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot(1, 1, 1)
+    france_atmo = cache.joindre(pd.Series(valeurs, index=cache.regions), niveau=niveau)
+    france_atmo.plot(
+        column="indice_atmo",
+        cmap=atmo_colors,
+        linewidth=0.8,
+        ax=ax,
+        edgecolor="black",
+        legend=False,
+        norm=norm,
+        missing_kwds={"color": "lightgrey"}
+    )
+    ax.set_title(titre, fontsize=14)
+    ax.axis("off")
+    ax.set_xlim(-0.75e6, 1.2e6)
+    ax.set_ylim(5e6, 6.75e6)
+    fig.legend(handles=legend_patches, title="Qualité de l'air", loc="lower center", ncol=3, frameon=False, fontsize=9)
+    fig.savefig(chemin, dpi=dpi, bbox_inches="tight")
+    return chemin
+
+
+@instrumenter
+def render_atmo_maps(df, france, dossier, start_date=None, end_date=None, format="png", dpi=100, figsize=(8, 8), niveau=1, nom_fichier="atmo_{day}", n_jobs=None):
+    """
+    Rend une carte de l'indice ATMO par jour dans un fichier, en parallèle et sans affichage.
+
+    Paramètres
+    ----------
+    df : pandas.DataFrame
+        Données contenant les colonnes 'region', 'day' et 'indice_atmo' (par exemple la sortie de `atmo`).
+    france : geopandas.GeoDataFrame ou CacheGeometrie
+        Régions françaises avec géométries.
+    dossier : str
+        Dossier de sortie (créé si nécessaire).
+    start_date, end_date : str ou None
+        Bornes de la période à rendre (format 'AAAA-MM-JJ'). Par défaut, tous les jours de `df`.
+    format : str
+        Format des images : 'png' ou 'svg' (par défaut 'png').
+    dpi : int
+        Résolution des images matricielles (par défaut 100).
+    figsize : tuple
+        Taille de chaque figure en pouces.
+    niveau : int
+        Niveau de simplification des géométries (par défaut 1, voir `CacheGeometrie`).
+    nom_fichier : str
+        Modèle du nom de fichier, sans extension ; `{day}` est remplacé par la date 'AAAA-MM-JJ'.
+    n_jobs : int ou None
+        Nombre de processus. None ou -1 utilise tous les cœurs, 1 rend dans le processus courant.
+
+    Retour
+    ------
+    list
+        Chemins des fichiers produits, dans l'ordre chronologique.
+
+    Le tableau ATMO est pivoté une seule fois en jours × régions ; chaque processus reçoit le cache
+    de géométries une fois à son démarrage puis rend ses cartes avec le backend Agg.
+    """
+    import os
+    import pandas as pd
+    from .geometrie import obtenir_cache_geometrie
+    from .parallele import executer_taches
+
+    with phase("pivot") as p:
+        cache = obtenir_cache_geometrie(france)
+        jours = pd.to_datetime(df['day'])
+        tableau = df.assign(day=jours).pivot_table(index='day', columns='region', values='indice_atmo', aggfunc='first')
+        tableau = tableau.loc[start_date:end_date].reindex(columns=cache.regions)
+        p.lignes(len(tableau))
+
+    os.makedirs(dossier, exist_ok=True)
+    taches = [
+        (
+            f"Indice ATMO par région - {day.strftime('%d/%m/%Y')}",
+            valeurs,
+            os.path.join(dossier, f"{nom_fichier.format(day=day.strftime('%Y-%m-%d'))}.{format}"),
+        )
+        for day, valeurs in zip(tableau.index, tableau.to_numpy())
+    ]
+
+    with phase("rendu"):
+        return executer_taches(
+            _rendre_carte_jour, taches, n_jobs,
+            initializer=_initialiser_rendu, initargs=(cache, niveau, figsize, dpi),
+        )
+
+
+@instrumenter
+def export_atmo_timelapse(df, france, sortie, start_date=None, end_date=None, fps=4, dpi=100, figsize=(8, 8), niveau=1):
+    """
+    Exporte l'évolution quotidienne de l'indice ATMO en animation (GIF/MP4) ou en dossier d'images.
+
+    Paramètres
+    ----------
+    df : pandas.DataFrame
+        Données contenant les colonnes 'region', 'day' et 'indice_atmo'.
+    france : geopandas.GeoDataFrame ou CacheGeometrie
+        Régions françaises avec géométries.
+    sortie : str
+        Fichier '.gif' ou '.mp4', ou dossier dans lequel écrire une image PNG par jour.
+    start_date, end_date : str ou None
+        Bornes de la période (format 'AAAA-MM-JJ'). Par défaut, tous les jours de `df`.
+    fps : int
+        Nombre d'images par seconde de l'animation.
+    dpi : int
+        Résolution des images.
+    figsize : tuple
+        Taille de la figure en pouces.
+    niveau : int
+        Niveau de simplification des géométries (par défaut 1, voir `CacheGeometrie`).
+
+    Retour
+    ------
+    str
+        Le chemin `sortie`.
+
+    Les polygones, la légende et le titre sont dessinés une seule fois ; chaque image ne fait que
+    changer les couleurs de la collection de polygones existante puis est écrite aussitôt. Avec
+    ffmpeg, les images sont transmises au fil de l'eau et la mémoire reste constante quelle que soit
+    la longueur de la période. Sans ffmpeg, le GIF est écrit avec Pillow, qui garde les images en
+    mémoire jusqu'à la fin : préférer alors un dossier d'images pour les longues périodes.
+    """
+    import os
+    import numpy as np
+    import pandas as pd
+    import shapely
+    from matplotlib import animation
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import to_rgba
+    from matplotlib.figure import Figure
+    from .geometrie import obtenir_cache_geometrie
+
+    cache = obtenir_cache_geometrie(france)
+    atmo_colors, norm, legend_patches = _style_atmo()
+
+    jours = pd.to_datetime(df['day'])
+    tableau = df.assign(day=jours).pivot_table(index='day', columns='region', values='indice_atmo', aggfunc='first')
+    tableau = tableau.loc[start_date:end_date].reindex(columns=cache.regions)
+
+    # Dessin unique des polygones, de la légende et du titre
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    geometries = cache.geometries(niveau)
+    geometries.plot(ax=ax, facecolor="lightgrey", edgecolor="black", linewidth=0.8)
+    collection = ax.collections[-1]
+    # Les multipolygones sont éclatés en une forme par partie : on répète la couleur de la région
+    n_parties = shapely.get_num_geometries(geometries.to_numpy())
+    if n_parties.sum() != len(collection.get_paths()):
+        raise ValueError("Les géométries vides ne sont pas prises en charge par l'export animé")
+    titre = ax.set_title("", fontsize=14)
+    ax.axis("off")
+    ax.set_xlim(-0.75e6, 1.2e6)
+    ax.set_ylim(5e6, 6.75e6)
+    fig.legend(handles=legend_patches, title="Qualité de l'air", loc="lower center", ncol=3, frameon=False, fontsize=9)
+
+    gris = np.array(to_rgba("lightgrey"))
+
+    def images():
+        for day, valeurs in zip(tableau.index, tableau.to_numpy(dtype=float)):
+            manquant = np.isnan(valeurs)
+            couleurs = atmo_colors(norm(np.where(manquant, 1, valeurs)))
+            couleurs[manquant] = gris
+            collection.set_facecolor(np.repeat(couleurs, n_parties, axis=0))
+            titre.set_text(f"Indice ATMO par région - {day.strftime('%d/%m/%Y')}")
+            yield day
+
+    extension = os.path.splitext(sortie)[1].lower()
+    if extension not in (".gif", ".mp4"):
+        os.makedirs(sortie, exist_ok=True)
+        for day in images():
+            fig.savefig(os.path.join(sortie, f"atmo_{day.strftime('%Y-%m-%d')}.png"), dpi=dpi)
+        return sortie
+
+    if animation.writers.is_available("ffmpeg"):
+        writer = animation.FFMpegWriter(fps=fps)
+    elif extension == ".gif":
+        writer = animation.PillowWriter(fps=fps)
+    else:
+        raise RuntimeError("ffmpeg est nécessaire pour l'export MP4")
+    with writer.saving(fig, sortie, dpi):
+        for _ in images():
+            writer.grab_frame()
+    return sortie
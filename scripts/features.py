@@ -0,0 +1,164 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Cache en mémoire des tables de features, indexé par l'empreinte des données et de la spécification,
+# les moins récemment utilisées étant évincées au-delà de TAILLE_CACHE_FEATURES entrées
+_CACHE_FEATURES = OrderedDict()
+TAILLE_CACHE_FEATURES = 8
+
+
+def colonnes_features(polluants, lags=(1, 2, 7), fenetres=(3, 7), calendrier=True):
+    """
+    Renvoie la liste des colonnes produites par `construire_features` pour une spécification donnée,
+    à transmettre comme `features_columns` aux fonctions d'entraînement.
+    """
+    colonnes = [f"{polluant}_lag{lag}" for polluant in polluants for lag in lags]
+    colonnes += [
+        f"{polluant}_{stat}{fenetre}"
+        for polluant in polluants
+        for fenetre in fenetres
+        for stat in ("moy", "max")
+    ]
+    if calendrier:
+        colonnes += ["jour_semaine", "mois", "jour_annee", "week_end", "saison_sin", "saison_cos"]
+    return colonnes
+
+
+def empreinte_features(df_daily, polluants, lags=(1, 2, 7), fenetres=(3, 7), calendrier=True):
+    """
+    Calcule l'empreinte (clé de cache) des données sources et de la spécification des features.
+    """
+    contenu = pd.util.hash_pandas_object(df_daily[['day', 'region'] + list(polluants)], index=False)
+    h = hashlib.sha1(contenu.to_numpy().tobytes())
+    h.update(repr((list(polluants), tuple(lags), tuple(fenetres), bool(calendrier))).encode())
+    return h.hexdigest()
+
+
+def _calculer_features(df_daily, polluants, lags, fenetres, calendrier):
+    df = df_daily[['day', 'region'] + list(polluants)].copy()
+    df['day'] = pd.to_datetime(df['day'])
+    df = df.sort_values(['region', 'day'], ignore_index=True)
+    if df.duplicated(['region', 'day']).any():
+        raise ValueError("Plusieurs lignes pour une même région et un même jour")
+
+    # Grille quotidienne complète de chaque région : un jour manquant donne des retards et des
+    # fenêtres manquants au lieu de décaler les valeurs d'une ligne à l'autre
+    etendue = df.groupby('region', sort=False)['day'].agg(['min', 'max'])
+    jours = [pd.date_range(debut, fin, freq='D') for debut, fin in zip(etendue['min'], etendue['max'])]
+    grille = pd.MultiIndex.from_arrays(
+        [np.repeat(etendue.index.to_numpy(), [len(j) for j in jours]), np.concatenate(jours)],
+        names=['region', 'day'],
+    )
+    complet = df.set_index(['region', 'day'])[list(polluants)].reindex(grille)
+    regions = complet.index.get_level_values('region')
+    groupes = complet.groupby(level='region', sort=False)
+
+    nouvelles = {}
+    for lag in lags:
+        decale = groupes.shift(lag)
+        for polluant in polluants:
+            nouvelles[f"{polluant}_lag{lag}"] = decale[polluant]
+
+    # Statistiques glissantes sur les jours précédents uniquement (décalage d'un jour),
+    # pour ne jamais utiliser la valeur du jour prédit
+    veille = groupes.shift(1).groupby(regions, sort=False)
+    for fenetre in fenetres:
+        glissant = veille.rolling(fenetre, min_periods=1)
+        moyenne = glissant.mean().droplevel(0)
+        maximum = glissant.max().droplevel(0)
+        for polluant in polluants:
+            nouvelles[f"{polluant}_moy{fenetre}"] = moyenne[polluant]
+            nouvelles[f"{polluant}_max{fenetre}"] = maximum[polluant]
+
+    # Retour de la grille complète aux seules lignes présentes dans les données
+    lignes = pd.MultiIndex.from_frame(df[['region', 'day']])
+    nouvelles = pd.DataFrame(nouvelles, index=grille).reindex(lignes).set_axis(df.index)
+
+    if calendrier:
+        jour_annee = df['day'].dt.dayofyear
+        angle = 2 * np.pi * jour_annee / 365.25
+        nouvelles["jour_semaine"] = df['day'].dt.dayofweek
+        nouvelles["mois"] = df['day'].dt.month
+        nouvelles["jour_annee"] = jour_annee
+        nouvelles["week_end"] = (df['day'].dt.dayofweek >= 5).astype(int)
+        nouvelles["saison_sin"] = np.sin(angle)
+        nouvelles["saison_cos"] = np.cos(angle)
+
+    return pd.concat([df, nouvelles], axis=1)
+
+
+def construire_features(df_daily, polluants, lags=(1, 2, 7), fenetres=(3, 7), calendrier=True, cache_dir=None):
+    """
+    Construit les features retardées, glissantes et calendaires de chaque région, avec mise en cache.
+
+    Parameters:
+    -----------
+    df_daily : pandas.DataFrame
+        Données journalières au format long, typiquement la sortie de `atmo`, avec les colonnes
+        'day', 'region' et les colonnes de `polluants`.
+    polluants : list
+        Polluants à partir desquels les features sont construites.
+    lags : tuple
+        Retards en jours des valeurs de polluants (par défaut 1, 2 et 7 jours).
+    fenetres : tuple
+        Tailles en jours des moyennes et maxima glissants (par défaut 3 et 7 jours).
+    calendrier : bool
+        Ajoute le jour de la semaine, le mois, le jour de l'année, un indicateur de week-end et
+        un encodage cyclique de la saison.
+    cache_dir : str, optional
+        Dossier du cache sur disque. Si None, seul le cache en mémoire est utilisé.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Les colonnes 'day', 'region' et `polluants`, triées par région puis par jour, suivies des
+        colonnes listées par `colonnes_features`.
+
+    Description:
+    ------------
+    1. L'empreinte des données sources et de la spécification sert de clé de cache : une table déjà
+       construite est renvoyée directement, depuis la mémoire ou depuis `cache_dir`.
+    2. Sinon, chaque région est complétée en une grille quotidienne, puis toutes les régions sont
+       traitées en une passe vectorisée (`groupby().shift` et `groupby().rolling`) ; le résultat
+       est mis en cache.
+
+    Notes:
+    ------
+    - Les retards et les fenêtres sont comptés en jours : pour une région à laquelle il manque
+      des jours, les retards tombant sur un jour absent sont manquants et les fenêtres ne portent
+      que sur les jours présents. Une même région ne doit avoir qu'une ligne par jour.
+    - Les statistiques glissantes s'arrêtent à la veille : aucune feature n'utilise la valeur du jour.
+    - Chaque appel renvoie une copie : la table peut être modifiée sans altérer le cache.
+    """
+    cle = empreinte_features(df_daily, polluants, lags, fenetres, calendrier)
+    if cle in _CACHE_FEATURES:
+        _CACHE_FEATURES.move_to_end(cle)
+        return _CACHE_FEATURES[cle].copy()
+
+    chemin = os.path.join(cache_dir, f"features_{cle}.pkl") if cache_dir is not None else None
+    if chemin is not None and os.path.exists(chemin):
+        with open(chemin, "rb") as f:
+            features = pickle.load(f)
+    else:
+        features = _calculer_features(df_daily, polluants, lags, fenetres, calendrier)
+        if chemin is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(chemin, "wb") as f:
+                pickle.dump(features, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    _CACHE_FEATURES[cle] = features
+    while len(_CACHE_FEATURES) > TAILLE_CACHE_FEATURES:
+        _CACHE_FEATURES.popitem(last=False)
+    return features.copy()
+
+
+def vider_cache_features():
+    """
+    Vide le cache en mémoire des features (le cache sur disque est conservé).
+    """
+    _CACHE_FEATURES.clear()
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+import pandas as pd
+
+# Caches de géométries déjà construits, indexés par empreinte des géométries et par options,
+# les moins récemment utilisés étant évincés au-delà de TAILLE_CACHE_GEOMETRIE entrées
+_CACHES_GEOMETRIE = OrderedDict()
+TAILLE_CACHE_GEOMETRIE = 8
+
+
+class CacheGeometrie:
+    """
+    Géométries des régions préparées une seule fois pour toutes les cartes.
+
+    Contient les géométries projetées (EPSG:3857 par défaut), plusieurs niveaux de simplification
+    et les points d'étiquetage (centroïdes) par région.
+
+    Les régions sont simplifiées ensemble comme une couverture (`shapely.coverage_simplify`,
+    GEOS >= 3.12) : chaque frontière commune est simplifiée une seule fois, sans trou ni
+    chevauchement entre régions voisines. Avec une version antérieure de GEOS, chaque région est
+    simplifiée séparément et des interstices peuvent apparaître le long des frontières.
+    L'attribut `empreinte` identifie les géométries sources (voir `empreinte_geometrie`).
+    """
+
+    def __init__(self, france, region_col="LIBELLE_REGION", tolerances=(1000, 5000, 20000), epsg=3857):
+        """
+        Parameters:
+        -----------
+        france : geopandas.GeoDataFrame
+            GeoDataFrame des régions françaises avec géométries.
+        region_col : str
+            Colonne contenant le nom des régions (par défaut 'LIBELLE_REGION').
+        tolerances : tuple
+            Tolérances de simplification, en unités du CRS projeté (mètres pour EPSG:3857).
+            Le niveau 0 correspond aux géométries complètes, le niveau i à `tolerances[i - 1]`.
+        epsg : int
+            CRS projeté utilisé pour les cartes (par défaut EPSG:3857).
+        """
+        geo = france[[region_col, "geometry"]].rename(columns={region_col: "region"})
+        geo = geo.set_index("region")
+        self.crs_origine = france.crs
+        self.empreinte = empreinte_geometrie(france, region_col)
+        self.regions = geo.index
+        self._origine = geo.geometry
+        projete = geo if france.crs.to_epsg() == epsg else geo.to_crs(epsg=epsg)
+        self.crs = projete.crs
+        self.tolerances = tuple(tolerances)
+        self.niveaux = [projete.geometry] + [_simplifier(projete.geometry, tolerance) for tolerance in self.tolerances]
+        self._points_labels = {}
+
+    def geometries(self, niveau=0):
+        """
+        Renvoie les géométries projetées (GeoSeries indexée par région) au niveau de simplification demandé.
+        """
+        return self.niveaux[niveau]
+
+    def points_labels(self, crs=None):
+        """
+        Renvoie les points d'étiquetage des régions (centroïdes calculés dans le CRS d'origine),
+        exprimés dans `crs` (par défaut, le CRS projeté des cartes). Le résultat est mémorisé par CRS.
+        """
+        crs = self.crs if crs is None else crs
+        cle = str(crs)
+        if cle not in self._points_labels:
+            self._points_labels[cle] = self._origine.centroid.to_crs(crs)
+        return self._points_labels[cle]
+
+    def joindre(self, valeurs, colonne="indice_atmo", niveau=0):
+        """
+        Associe des valeurs régionales aux géométries projetées, sans jointure ni reprojection.
+
+        Parameters:
+        -----------
+        valeurs : pandas.Series or pandas.DataFrame
+            Series indexée par région, ou DataFrame avec une colonne 'region' et la colonne `colonne`.
+        colonne : str
+            Nom de la colonne de valeurs dans le GeoDataFrame renvoyé.
+        niveau : int
+            Niveau de simplification des géométries.
+
+        Returns:
+        --------
+        geopandas.GeoDataFrame
+            Une ligne par région du cache, avec les colonnes 'region', `colonne` et 'geometry'
+            (valeur manquante pour les régions absentes de `valeurs`).
+        """
+        import geopandas as gpd
+
+        if isinstance(valeurs, pd.DataFrame):
+            valeurs = valeurs.drop_duplicates("region").set_index("region")[colonne]
+        return gpd.GeoDataFrame(
+            {
+                "region": self.regions,
+                colonne: valeurs.reindex(self.regions).to_numpy(),
+            },
+            geometry=self.niveaux[niveau].to_numpy(),
+            crs=self.crs,
+        )
+
+
+def _simplifier(geometries, tolerance):
+    """
+    Simplifie une GeoSeries de régions en conservant les frontières communes lorsque GEOS le permet.
+    """
+    import geopandas as gpd
+    import shapely
+
+    if shapely.geos_version < (3, 12, 0):
+        return geometries.simplify(tolerance, preserve_topology=True)
+    return gpd.GeoSeries(shapely.coverage_simplify(geometries.to_numpy(), tolerance), index=geometries.index, crs=geometries.crs)
+
+
+def empreinte_geometrie(france, region_col="LIBELLE_REGION"):
+    """
+    Empreinte (sha1) du CRS, des géométries (WKB) et des noms de régions d'un GeoDataFrame.
+    """
+    import hashlib
+    import shapely
+
+    h = hashlib.sha1(str(france.crs).encode())
+    h.update(b"".join(shapely.to_wkb(france.geometry.to_numpy())))
+    h.update("|".join(map(str, france[region_col])).encode())
+    return h.hexdigest()
+
+
+def obtenir_cache_geometrie(france, **kwargs):
+    """
+    Renvoie le `CacheGeometrie` associé au contenu de `france`, construit au premier appel puis
+    réutilisé. Si `france` est déjà un `CacheGeometrie`, il est renvoyé tel quel.
+
+    Le cache est indexé par l'empreinte des géométries (voir `empreinte_geometrie`) : un
+    GeoDataFrame modifié sur place (géométries, CRS) obtient un nouveau cache, et aucune référence
+    aux GeoDataFrames sources n'est conservée.
+    """
+    if isinstance(france, CacheGeometrie):
+        return france
+    cle = (empreinte_geometrie(france, kwargs.get("region_col", "LIBELLE_REGION")), repr(sorted(kwargs.items())))
+    cache = _CACHES_GEOMETRIE.get(cle)
+    if cache is None:
+        cache = _CACHES_GEOMETRIE[cle] = CacheGeometrie(france, **kwargs)
+        while len(_CACHES_GEOMETRIE) > TAILLE_CACHE_GEOMETRIE:
+            _CACHES_GEOMETRIE.popitem(last=False)
+    else:
+        _CACHES_GEOMETRIE.move_to_end(cle)
+    return cache
@@ -1,3 +1,6 @@
+from .instrumentation import instrumenter, phase
+
+
 # Define functions to compute sub-indices for each pollutant
 def get_subindex_pm10(value):
     if value <= 6: return 1
@@ -58,8 +61,49 @@ def get_subindex_so2(value):
     elif value <= 399: return 8
     elif value <= 499: return 9
     else: return 10
+
+
+# Bornes supérieures des sous-indices 1 à 9 (au-delà : 10), identiques aux fonctions get_subindex_*,
+# indexées par le nom de colonne du polluant
+SEUILS_ATMO = {
+    'pm10': [6, 13, 20, 27, 34, 41, 49, 64, 79],
+    'pm2_5': [5, 10, 15, 20, 25, 30, 40, 50, 75],
+    'nitrogen_dioxide': [29, 54, 84, 109, 134, 164, 199, 274, 399],
+    'ozone': [29, 54, 79, 104, 129, 149, 179, 209, 239],
+    'sulphur_dioxide': [39, 79, 119, 159, 199, 249, 299, 399, 499],
+}
+
+# Catégories de l'indice ATMO : (libellé, indice minimal, indice maximal)
+CATEGORIES_ATMO = [
+    ("Très bon", 1, 2),
+    ("Bon", 3, 4),
+    ("Moyen", 5, 5),
+    ("Médiocre", 6, 7),
+    ("Mauvais", 8, 9),
+    ("Très mauvais", 10, 10),
+]
+
+
+def subindex_array(values, polluant):
+    """
+    Version vectorisée des fonctions get_subindex_* : calcule le sous-indice de chaque valeur
+    d'un tableau (de forme quelconque) de concentrations du polluant `polluant`.
+    """
+    import numpy as np
+    return np.searchsorted(SEUILS_ATMO[polluant], values, side='left') + 1
+
+
+def categorie_array(indices):
+    """
+    Convertit un tableau d'indices ATMO (1 à 10) en numéros de catégorie (0 à 5, dans l'ordre de
+    `CATEGORIES_ATMO`).
+    """
+    import numpy as np
+    bornes = [maximum for _, _, maximum in CATEGORIES_ATMO[:-1]]
+    return np.searchsorted(bornes, indices, side='left')
     
 
+@instrumenter
 def atmo(df_hourly, regions):
 
     """
@@ -91,45 +135,48 @@ def atmo(df_hourly, regions):
     Description:
     ------------
     1. Calcule les moyennes journalières des variables à partir des données horaires.
-    2. Calcule les sous-indices pour chaque polluant selon les règles définies par les fonctions associées (e.g., `get_subindex_pm10`).
+    2. Calcule les sous-indices pour chaque polluant selon les seuils de `SEUILS_ATMO` (mêmes règles que les fonctions associées, e.g. `get_subindex_pm10`).
     3. Calcule l'indice Atmo final comme le maximum des sous-indices pour chaque jour et chaque région.
     4. Filtre les données pour inclure uniquement les régions spécifiées dans la liste `regions`.
 
     Notes:
     ------
     - L'indice pour l'ozone est calculé à partir de la moyenne glissante maximale sur 8 heures.
-    - Assurez-vous que les fonctions `get_subindex_pm10`, `get_subindex_pm2_5`, `get_subindex_no2`, 
-      `get_subindex_o3` et `get_subindex_so2` sont disponibles dans l'environnement.
+    - Les sous-indices sont calculés en une opération vectorisée par polluant (`subindex_array`).
     """
     
-        # Calcul des moyennes journalières pour toutes les variables
-    daily_data = df_hourly.groupby(['day', 'region']).agg({
-        'pm10': 'mean',
-        'pm2_5': 'mean',
-        'nitrogen_dioxide': 'mean',
-        'ozone': lambda x: x.rolling(8, min_periods=1).mean().max(),  # Max sur 8h glissantes
-        'sulphur_dioxide': 'mean',
-        'temperature_2m'  : 'mean',        
-        'relative_humidity_2m' : 'mean' , 
-        'precipitation'   : 'mean'  ,      
-        'surface_pressure'  : 'mean' ,    
-        'wind_speed_10m': 'mean'
-    }).reset_index()
+    # Calcul des moyennes journalières pour toutes les variables
+    with phase("agregation") as p:
+        daily_data = df_hourly.groupby(['day', 'region']).agg({
+            'pm10': 'mean',
+            'pm2_5': 'mean',
+            'nitrogen_dioxide': 'mean',
+            'ozone': lambda x: x.rolling(8, min_periods=1).mean().max(),  # Max sur 8h glissantes
+            'sulphur_dioxide': 'mean',
+            'temperature_2m'  : 'mean',        
+            'relative_humidity_2m' : 'mean' , 
+            'precipitation'   : 'mean'  ,      
+            'surface_pressure'  : 'mean' ,    
+            'wind_speed_10m': 'mean'
+        }).reset_index()
+        p.lignes(len(daily_data))
 
     # Calcul des sous-indices
-    daily_data['subindex_pm10'] = daily_data['pm10'].apply(get_subindex_pm10)
-    daily_data['subindex_pm2_5'] = daily_data['pm2_5'].apply(get_subindex_pm2_5)
-    daily_data['subindex_no2'] = daily_data['nitrogen_dioxide'].apply(get_subindex_no2)
-    daily_data['subindex_o3'] = daily_data['ozone'].apply(get_subindex_o3)
-    daily_data['subindex_so2'] = daily_data['sulphur_dioxide'].apply(get_subindex_so2)
+    with phase("sous_indices"):
+        daily_data['subindex_pm10'] = subindex_array(daily_data['pm10'], 'pm10')
+        daily_data['subindex_pm2_5'] = subindex_array(daily_data['pm2_5'], 'pm2_5')
+        daily_data['subindex_no2'] = subindex_array(daily_data['nitrogen_dioxide'], 'nitrogen_dioxide')
+        daily_data['subindex_o3'] = subindex_array(daily_data['ozone'], 'ozone')
+        daily_data['subindex_so2'] = subindex_array(daily_data['sulphur_dioxide'], 'sulphur_dioxide')
 
-    # Calcul de l'indice Atmo final
-    daily_data['indice_atmo'] = daily_data[[
-        'subindex_pm10', 'subindex_pm2_5', 'subindex_no2', 'subindex_o3', 'subindex_so2'
-    ]].max(axis=1)
+        # Calcul de l'indice Atmo final
+        daily_data['indice_atmo'] = daily_data[[
+            'subindex_pm10', 'subindex_pm2_5', 'subindex_no2', 'subindex_o3', 'subindex_so2'
+        ]].max(axis=1)
 
     # Fusion avec le DataFrame original pour conserver uniquement les colonnes de df
-    df_final = df_hourly[['day', 'region']].drop_duplicates().merge(daily_data, on=['day', 'region'], how='left')
-    # Filtrage des régions européennes
-    df_final = df_final[df_final['region'].isin(regions)]
+    with phase("fusion"):
+        df_final = df_hourly[['day', 'region']].drop_duplicates().merge(daily_data, on=['day', 'region'], how='left')
+        # Filtrage des régions européennes
+        df_final = df_final[df_final['region'].isin(regions)]
     return df_final
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+Instrumentation optionnelle des fonctions publiques : temps réel, temps CPU, pic mémoire et
+nombre de lignes de chaque appel et de chaque phase interne, écrits en JSON lines.
+
+Activation :
+- variable d'environnement SCRIPTS_PROFIL=chemin.jsonl (SCRIPTS_PROFIL=1 écrit dans 'profil.jsonl') ;
+  SCRIPTS_PROFIL_MEMOIRE=0 désactive la mesure mémoire (tracemalloc ralentit les allocations) ;
+- ou bloc `with profilage("profil.jsonl"):`.
+
+Désactivée, l'instrumentation coûte un test de booléen par appel et par phase.
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# État global : fichier de sortie (None si désactivée) et mesure mémoire
+_ETAT = {"sortie": None, "memoire": False}
+_LOCAL = threading.local()
+_VERROU = threading.Lock()
+
+
+def _activer(sortie, memoire):
+    _ETAT["sortie"] = sortie
+    _ETAT["memoire"] = memoire
+    if memoire and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _pile():
+    pile = getattr(_LOCAL, "pile", None)
+    if pile is None:
+        pile = _LOCAL.pile = []
+    return pile
+
+
+def _lignes(objet):
+    """
+    Nombre de lignes d'un DataFrame, d'une Series ou d'un tableau (None pour les autres objets).
+    """
+    forme = getattr(objet, "shape", None)
+    if isinstance(forme, tuple) and forme:
+        return int(forme[0])
+    return None
+
+
+def _ecrire(enregistrement):
+    ligne = json.dumps(enregistrement, ensure_ascii=False, default=str) + "\n"
+    with _VERROU, open(_ETAT["sortie"], "a", encoding="utf-8") as f:
+        f.write(ligne)
+
+
+class _Mesure:
+    """
+    Mesure d'un appel ou d'une phase ; les mesures imbriquées forment un chemin 'appel/phase'.
+    """
+
+    def __init__(self, type_, nom, lignes_entree=None):
+        self.type = type_
+        self.nom = nom
+        self.lignes_entree = lignes_entree
+        self.lignes_sortie = None
+        self.pic = 0
+
+    def __enter__(self):
+        pile = _pile()
+        self.chemin = f"{pile[-1].chemin}/{self.nom}" if pile else self.nom
+        if _ETAT["memoire"]:
+            courant, pic = tracemalloc.get_traced_memory()
+            if pile:
+                # Le pic du parent est conservé avant la remise à zéro pour la mesure imbriquée
+                pile[-1].pic = max(pile[-1].pic, pic)
+            tracemalloc.reset_peak()
+            self.base = courant
+        pile.append(self)
+        self.debut = time.time()
+        self.debut_perf = time.perf_counter()
+        self.debut_cpu = time.process_time()
+        return self
+
+    def lignes(self, n):
+        """
+        Renseigne le nombre de lignes produit par la phase.
+        """
+        self.lignes_sortie = n
+
+    def __exit__(self, type_exc, exc, tb):
+        duree = time.perf_counter() - self.debut_perf
+        cpu = time.process_time() - self.debut_cpu
+        pile = _pile()
+        pile.pop()
+        enregistrement = {
+            "type": self.type,
+            "nom": self.nom,
+            "chemin": self.chemin,
+            "debut": self.debut,
+            "duree_s": duree,
+            "cpu_s": cpu,
+            "pid": os.getpid(),
+            "thread": threading.current_thread().name,
+        }
+        if _ETAT["memoire"] and tracemalloc.is_tracing():
+            self.pic = max(self.pic, tracemalloc.get_traced_memory()[1])
+            enregistrement["memoire_pic_o"] = max(0, self.pic - self.base)
+            if pile:
+                pile[-1].pic = max(pile[-1].pic, self.pic)
+        if self.lignes_entree is not None:
+            enregistrement["lignes_entree"] = self.lignes_entree
+        if self.lignes_sortie is not None:
+            enregistrement["lignes_sortie"] = self.lignes_sortie
+        if type_exc is not None:
+            enregistrement["erreur"] = type_exc.__name__
+        _ecrire(enregistrement)
+        return False
+
+
+class _PhaseInactive:
+    def lignes(self, n):
+        pass
+
+
+_PHASE_INACTIVE = contextlib.nullcontext(_PhaseInactive())
+
+
+def instrumentation_active():
+    """
+    Indique si l'instrumentation est activée.
+    """
+    return _ETAT["sortie"] is not None
+
+
+def instrumenter(fonction):
+    """
+    Décorateur : mesure chaque appel de `fonction` lorsque l'instrumentation est activée.
+
+    Le nombre de lignes d'entrée est celui du premier argument positionnel ayant une forme
+    (DataFrame, Series, tableau) ; le nombre de lignes de sortie, celui du résultat.
+    """
+    nom = fonction.__name__
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        if _ETAT["sortie"] is None:
+            return fonction(*args, **kwargs)
+        lignes_entree = next((n for n in map(_lignes, args) if n is not None), None)
+        with _Mesure("appel", nom, lignes_entree) as mesure:
+            resultat = fonction(*args, **kwargs)
+            mesure.lignes(_lignes(resultat[0] if isinstance(resultat, tuple) and resultat else resultat))
+        return resultat
+
+    return enveloppe
+
+
+def phase(nom):
+    """
+    Contexte mesurant une phase interne d'une fonction (par exemple 'requetes' ou 'assemblage').
+
+    Le contexte renvoyé expose `lignes(n)` pour renseigner le nombre de lignes produit.
+
+    Exemple :
+        with phase("agregation") as p:
+            daily = df.groupby(...).agg(...)
+            p.lignes(len(daily))
+    """
+    if _ETAT["sortie"] is None:
+        return _PHASE_INACTIVE
+    return _Mesure("phase", nom)
+
+
+@contextlib.contextmanager
+def profilage(sortie="profil.jsonl", memoire=True):
+    """
+    Active l'instrumentation dans un bloc `with`.
+
+    Parameters:
+    -----------
+    sortie : str
+        Fichier JSON lines auquel les mesures sont ajoutées.
+    memoire : bool
+        Mesure le pic mémoire Python (tracemalloc) de chaque appel et phase.
+
+    Notes:
+    ------
+    - La variable d'environnement SCRIPTS_PROFIL est positionnée pendant le bloc : les processus
+      de travail démarrés dans le bloc (ProcessPoolExecutor) écrivent dans le même fichier.
+    """
+    precedent = dict(_ETAT), os.environ.get("SCRIPTS_PROFIL"), os.environ.get("SCRIPTS_PROFIL_MEMOIRE")
+    sortie = os.path.abspath(sortie)
+    os.environ["SCRIPTS_PROFIL"] = sortie
+    os.environ["SCRIPTS_PROFIL_MEMOIRE"] = "1" if memoire else "0"
+    demarre = memoire and not tracemalloc.is_tracing()
+    _activer(sortie, memoire)
+    try:
+        yield sortie
+    finally:
+        _ETAT.update(precedent[0])
+        for variable, valeur in zip(("SCRIPTS_PROFIL", "SCRIPTS_PROFIL_MEMOIRE"), precedent[1:]):
+            if valeur is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = valeur
+        if demarre:
+            tracemalloc.stop()
+
+
+def lire_profil(chemin="profil.jsonl"):
+    """
+    Relit un fichier de mesures et résume les temps par chemin d'appel ou de phase.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Une ligne par chemin : 'n_appels', 'duree_totale_s', 'duree_moyenne_s', 'duree_max_s',
+        'cpu_total_s', 'memoire_pic_max_o', 'lignes_sortie', triée par durée totale décroissante.
+    """
+    import pandas as pd
+
+    mesures = pd.read_json(chemin, lines=True)
+    for colonne in ("memoire_pic_o", "lignes_sortie"):
+        if colonne not in mesures:
+            mesures[colonne] = float("nan")
+    resume = mesures.groupby("chemin").agg(
+        n_appels=("duree_s", "size"),
+        duree_totale_s=("duree_s", "sum"),
+        duree_moyenne_s=("duree_s", "mean"),
+        duree_max_s=("duree_s", "max"),
+        cpu_total_s=("cpu_s", "sum"),
+        memoire_pic_max_o=("memoire_pic_o", "max"),
+        lignes_sortie=("lignes_sortie", "sum"),
+    )
+    return resume.sort_values("duree_totale_s", ascending=False)
+
+
+if os.environ.get("SCRIPTS_PROFIL"):
+    _activer(
+        "profil.jsonl" if os.environ["SCRIPTS_PROFIL"] == "1" else os.environ["SCRIPTS_PROFIL"],
+        os.environ.get("SCRIPTS_PROFIL_MEMOIRE", "1") != "0",
+    )
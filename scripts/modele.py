@@ -1,10 +1,5 @@
+from .instrumentation import instrumenter, phase
 
-from statsmodels.tsa.stattools import adfuller
-from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
-from statsmodels.tsa.arima.model import ARIMA
-import matplotlib.pyplot as plt
-import pandas as pd
-from sklearn.metrics import root_mean_squared_error
 
 def stationarity_acf(data,var):
     """
@@ -17,6 +12,9 @@ def stationarity_acf(data,var):
     Retourne:
     - Affiche si la variable est stationnaire ou pas. Ainsi que les graphes des autocorrelations.
     """
+    import matplotlib.pyplot as plt
+    from statsmodels.tsa.stattools import adfuller
+    from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
     result = adfuller(data[var])
     #print(f"ADF Statistic: {result[0]}")
     #print(f"p-value: {result[1]}")
@@ -31,9 +29,214 @@ def stationarity_acf(data,var):
 
 
 
+def _diagnostic_serie(cle, serie, nlags, max_diff, seuil):
+    """
+    Calcule les tests ADF/KPSS, l'ordre de différenciation suggéré et les
+    autocorrélations (ACF/PACF) d'une série, sans aucun affichage.
+
+    Une série inexploitable (constante, trop courte...) ne fait pas échouer le lot : ses
+    statistiques sont NaN et 'erreur' contient le message.
+    """
+    import numpy as np
+    import pandas as pd
+
+    try:
+        stats, autocorr = _diagnostic_valeurs(serie, nlags, max_diff, seuil)
+    except Exception as e:
+        stats = dict.fromkeys(["n_obs", "adf_stat", "adf_pvalue", "kpss_stat", "kpss_pvalue", "stationnaire", "ordre_diff"], np.nan)
+        stats["n_obs"] = int(pd.Series(serie).notna().sum())
+        stats["erreur"] = str(e)
+        autocorr = pd.DataFrame(columns=["lag", "acf", "pacf", "borne"])
+    return cle, stats, autocorr
+
+
+def _diagnostic_valeurs(serie, nlags, max_diff, seuil):
+    import warnings
+    import numpy as np
+    import pandas as pd
+    from statsmodels.tsa.stattools import adfuller, kpss, acovf, levinson_durbin
+
+    def tests(x):
+        adf_stat, adf_pvalue = adfuller(x, autolag="AIC")[:2]
+        with warnings.catch_warnings():
+            # KPSS avertit lorsque la p-value sort de sa table d'interpolation
+            warnings.simplefilter("ignore")
+            kpss_stat, kpss_pvalue = kpss(x, regression="c", nlags="auto")[:2]
+        return adf_stat, adf_pvalue, kpss_stat, kpss_pvalue
+
+    x = np.asarray(serie, dtype=float)
+    x = x[~np.isnan(x)]
+    if len(x) == 0 or np.ptp(x) == 0:
+        raise ValueError("série vide ou constante")
+    adf_stat, adf_pvalue, kpss_stat, kpss_pvalue = tests(x)
+    stationnaire = adf_pvalue < seuil and kpss_pvalue >= seuil
+
+    # Ordre de différenciation : on différencie jusqu'à ce que l'ADF rejette
+    # la racine unitaire et que le KPSS ne rejette pas la stationnarité
+    ordre_diff = 0
+    y = x
+    est_stationnaire = stationnaire
+    while not est_stationnaire and ordre_diff < max_diff:
+        y = np.diff(y)
+        ordre_diff += 1
+        _, p_adf, _, p_kpss = tests(y)
+        est_stationnaire = p_adf < seuil and p_kpss >= seuil
+
+    # ACF par FFT, puis PACF par Levinson-Durbin sur ces mêmes autocovariances
+    nlags = min(nlags, len(x) // 2 - 1)
+    autocov = acovf(x, fft=True)[:nlags + 1]
+    acf_valeurs = autocov / autocov[0]
+    pacf_valeurs = levinson_durbin(autocov, nlags=nlags, isacov=True)[2]
+
+    stats = {
+        "n_obs": len(x),
+        "adf_stat": adf_stat,
+        "adf_pvalue": adf_pvalue,
+        "kpss_stat": kpss_stat,
+        "kpss_pvalue": kpss_pvalue,
+        "stationnaire": stationnaire,
+        "ordre_diff": ordre_diff if est_stationnaire else np.nan,
+        "erreur": None,
+    }
+    autocorr = pd.DataFrame({
+        "lag": np.arange(nlags + 1),
+        "acf": acf_valeurs,
+        "pacf": pacf_valeurs,
+        "borne": 1.96 / np.sqrt(len(x)),
+    })
+    return stats, autocorr
+
+
+def _diagnostic_serie_tache(args):
+    return _diagnostic_serie(*args)
+
+
+def stationarity_table(data, variables=None, by="region", nlags=40, max_diff=2, seuil=0.05, n_jobs=None):
+    """
+    Diagnostic de stationnarité et d'autocorrélation d'un grand nombre de séries, sans affichage.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame ou dict
+        - DataFrame au format long (par exemple la sortie journalière de `atmo`), dont les séries
+          sont les colonnes `variables` découpées selon la colonne `by` ;
+        - ou dictionnaire {nom: pandas.Series} de séries déjà constituées.
+    variables : list, optional
+        Colonnes à analyser lorsque `data` est un DataFrame.
+    by : str or None
+        Colonne de regroupement (par défaut 'region'). Si None, chaque variable forme une seule série.
+    nlags : int
+        Nombre de retards pour l'ACF et la PACF (par défaut 40).
+    max_diff : int
+        Ordre de différenciation maximal testé (par défaut 2).
+    seuil : float
+        Niveau des tests ADF et KPSS (par défaut 0.05).
+    n_jobs : int or None
+        Nombre de processus utilisés. None ou -1 utilise tous les cœurs, 1 exécute en série.
+
+    Returns:
+    --------
+    tuple (pandas.DataFrame, pandas.DataFrame)
+        - Table des tests, une ligne par série : 'n_obs', 'adf_stat', 'adf_pvalue', 'kpss_stat',
+          'kpss_pvalue', 'stationnaire', 'ordre_diff' (NaN si la série reste non stationnaire
+          après `max_diff` différenciations) et 'erreur' (message si la série est inexploitable,
+          par exemple constante ou trop courte ; ses statistiques sont alors NaN).
+        - Table longue des autocorrélations : 'lag', 'acf', 'pacf' et 'borne' (intervalle à 95 %).
+        Les deux tables portent les colonnes d'identification `by` et 'variable' (ou 'serie').
+
+    Notes:
+    ------
+    - Une série est jugée stationnaire lorsque l'ADF rejette la racine unitaire et que le KPSS
+      ne rejette pas la stationnarité.
+    - Les graphiques sont produits séparément par `plot_autocorrelations`.
+    """
+    import pandas as pd
+    from .parallele import executer_taches
+
+    if isinstance(data, dict):
+        series = dict(data)
+        noms_cles = ["serie"]
+    elif by is None:
+        series = {(var,): data[var] for var in variables}
+        noms_cles = ["variable"]
+    else:
+        series = {
+            (groupe, var): donnees_groupe[var]
+            for groupe, donnees_groupe in data.groupby(by, sort=True)
+            for var in variables
+        }
+        noms_cles = [by, "variable"]
+
+    taches = [(cle, serie, nlags, max_diff, seuil) for cle, serie in series.items()]
+    resultats = executer_taches(_diagnostic_serie_tache, taches, n_jobs)
+
+    lignes = []
+    autocorrs = []
+    for cle, stats, autocorr in resultats:
+        identifiant = dict(zip(noms_cles, cle if isinstance(cle, tuple) else (cle,)))
+        lignes.append({**identifiant, **stats})
+        autocorrs.append(autocorr.assign(**identifiant))
+
+    table = pd.DataFrame(lignes)
+    autocorr = pd.concat(autocorrs, ignore_index=True)[noms_cles + ["lag", "acf", "pacf", "borne"]]
+    return table, autocorr
+
+
+def plot_autocorrelations(autocorr, series=None, n_cols=2):
+    """
+    Trace les ACF et PACF calculées par `stationarity_table`.
+
+    Parameters:
+    -----------
+    autocorr : pandas.DataFrame
+        Table longue des autocorrélations renvoyée par `stationarity_table`.
+    series : list, optional
+        Identifiants des séries à tracer (tuples des colonnes d'identification, ou valeurs
+        simples s'il n'y en a qu'une). Par défaut, toutes les séries.
+    n_cols : int
+        Nombre de séries par ligne de la grille (chaque série occupe une ACF et une PACF).
+    """
+    import matplotlib.pyplot as plt
+    cles = [col for col in autocorr.columns if col not in ("lag", "acf", "pacf", "borne")]
+    groupes = dict(list(autocorr.groupby(cles if len(cles) > 1 else cles[0], sort=False)))
+    if series is not None:
+        groupes = {cle: groupes[cle] for cle in series}
+
+    n_rows = (len(groupes) + n_cols - 1) // n_cols
+    fig, axes = plt.subplots(n_rows, 2 * n_cols, figsize=(8 * n_cols, 3 * n_rows), squeeze=False)
+    axes = axes.flatten()
+    for i, (cle, groupe) in enumerate(groupes.items()):
+        titre = " - ".join(map(str, cle)) if isinstance(cle, tuple) else str(cle)
+        for ax, mesure in zip(axes[2 * i:2 * i + 2], ("acf", "pacf")):
+            ax.vlines(groupe["lag"], 0, groupe[mesure], color="steelblue")
+            ax.scatter(groupe["lag"], groupe[mesure], color="steelblue", s=10)
+            ax.fill_between(groupe["lag"], -groupe["borne"], groupe["borne"], color="skyblue", alpha=0.3)
+            ax.axhline(0, color="black", linewidth=0.8)
+            ax.set_title(f"{mesure.upper()} {titre}", fontsize=10)
+
+    for j in range(2 * len(groupes), len(axes)):
+        axes[j].set_visible(False)
+
+    plt.tight_layout()
+    plt.show()
+
+
+
 
     
-def fit_arima(data,var,p,d,q):
+# Moteurs d'estimation ARIMA : nom exposé -> méthode de `ARIMA.fit`
+ARIMA_ENGINES = {
+    "mle": "statespace",
+    "innovations_mle": "innovations_mle",
+    "hannan_rissanen": "hannan_rissanen",
+    "innovations": "innovations",
+    "yule_walker": "yule_walker",
+    "burg": "burg",
+}
+
+
+@instrumenter
+def fit_arima(data,var,p,d,q,engine="mle"):
     """
     Fonction pour entrainer le modele ARiMA sur notre série
     
@@ -41,15 +244,127 @@ def fit_arima(data,var,p,d,q):
     - data : base de données utilisée.
     - var : variable d'interêt.
     - p,d,q :  spécification dans la modelisation ARIMA
+    - engine : moteur d'estimation (voir `ARIMA_ENGINES`). 'mle' (par défaut) est le maximum de
+      vraisemblance complet de statsmodels, à garder pour les modèles finaux. 'hannan_rissanen'
+      (tout ARMA) ou 'innovations' (MA pur), 'yule_walker' et 'burg' (AR pur) sont des estimateurs
+      rapides sans optimisation numérique, adaptés au criblage et aux ajustements en masse.
+      Ces moteurs ne contraignent pas la stationnarité ni l'inversibilité des paramètres
+      (une marche aléatoire peut donner une racine AR proche de 1).
 
     Retourne:
     - le modele entrainé
     """
-    model = ARIMA(data[var], order=(p,d,q)) 
-    model_fit = model.fit() 
+    from statsmodels.tsa.arima.model import ARIMA
+    import warnings
+
+    if engine not in ARIMA_ENGINES:
+        raise ValueError(f"Moteur inconnu : {engine}. Choix possibles : {list(ARIMA_ENGINES)}")
+    if ARIMA_ENGINES[engine] in ("statespace", "innovations_mle"):
+        model = ARIMA(data[var], order=(p,d,q))
+    else:
+        # Les estimateurs rapides échouent sur des paramètres non stationnaires au lieu de les contraindre
+        model = ARIMA(data[var], order=(p,d,q), enforce_stationarity=False, enforce_invertibility=False)
+    with warnings.catch_warnings():
+        # Les moteurs rapides différencient la série eux-mêmes et le signalent par un avertissement
+        warnings.filterwarnings("ignore", message="Provided `endog` series has been differenced")
+        model_fit = model.fit(method=ARIMA_ENGINES[engine])
     return model_fit
 
 
+def _fit_arima_tache(args):
+    data, var, p, d, q, engine = args
+    try:
+        return var, fit_arima(data, var, p, d, q, engine=engine), None
+    except Exception as e:
+        return var, None, str(e)
+
+
+def fit_arima_lot(data, variables, p, d, q, engine="hannan_rissanen", n_jobs=None):
+    """
+    Ajuste un modèle ARIMA de même ordre sur un grand nombre de séries.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        DataFrame contenant une colonne par série (par exemple une par point de grille).
+    variables : list
+        Colonnes à modéliser.
+    p, d, q : int
+        Ordre ARIMA commun à toutes les séries.
+    engine : str
+        Moteur d'estimation (par défaut 'hannan_rissanen', voir `fit_arima`).
+    n_jobs : int or None
+        Nombre de processus. None ou -1 utilise tous les cœurs, 1 exécute en série.
+
+    Returns:
+    --------
+    tuple
+        - dict {variable: modèle ajusté}, None pour les séries dont l'ajustement a échoué ;
+        - dict {variable: message d'erreur} des séries en échec, qui ne font pas échouer le lot.
+    """
+    from .parallele import executer_taches
+
+    taches = [(data[[var]], var, p, d, q, engine) for var in variables]
+    modeles, erreurs = {}, {}
+    for var, model_fit, erreur in executer_taches(_fit_arima_tache, taches, n_jobs):
+        modeles[var] = model_fit
+        if erreur is not None:
+            erreurs[var] = erreur
+    return modeles, erreurs
+
+
+def benchmark_arima_engines(data, var, p, d, q, engines=("mle", "innovations_mle", "hannan_rissanen"), test_size=14, repetitions=3):
+    """
+    Compare les moteurs d'estimation ARIMA en temps d'ajustement et en précision de prévision.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Données historiques contenant la colonne `var`.
+    var : str
+        Variable d'intérêt.
+    p, d, q : int
+        Ordre ARIMA testé.
+    engines : tuple
+        Moteurs comparés (voir `ARIMA_ENGINES`).
+    test_size : int
+        Nombre de dernières observations réservées à l'évaluation (par défaut 14 jours).
+    repetitions : int
+        Nombre d'ajustements chronométrés par moteur ; le temps retenu est le minimum.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Une ligne par moteur avec 'temps_fit_s', 'rmse' (prévision à `test_size` pas sur la période
+        de test), 'aic' et 'erreur' (message si le moteur ne s'applique pas à l'ordre demandé).
+    """
+    import pandas as pd
+    from sklearn.metrics import root_mean_squared_error
+    import time
+    import numpy as np
+
+    train, test = data.iloc[:-test_size], data.iloc[-test_size:]
+    lignes = []
+    for engine in engines:
+        ligne = {"engine": engine, "temps_fit_s": np.nan, "rmse": np.nan, "aic": np.nan, "erreur": None}
+        try:
+            temps = []
+            for _ in range(repetitions):
+                debut = time.perf_counter()
+                model_fit = fit_arima(train, var, p, d, q, engine=engine)
+                temps.append(time.perf_counter() - debut)
+            forecast = model_fit.forecast(steps=test_size)
+            ligne.update(
+                temps_fit_s=min(temps),
+                rmse=root_mean_squared_error(test[var], np.asarray(forecast)),
+                aic=model_fit.aic,
+            )
+        except Exception as e:
+            ligne["erreur"] = str(e)
+        lignes.append(ligne)
+    return pd.DataFrame(lignes)
+
+
 
 
 def prediction_arima(data,var,model_fit):
@@ -83,6 +398,7 @@ def prediction_arima(data,var,model_fit):
     - La colonne 'day' dans `data` doit contenir des objets de type datetime ou équivalent pour un traçage correct.
     - Le modèle ARIMA doit être préalablement entraîné sur les données fournies.
     """
+    import matplotlib.pyplot as plt
     #prediction
     plt.figure(figsize=(10, 6))
     plt.plot(data["day"],data[var], label="real",color="black")
@@ -126,6 +442,8 @@ def prevision_arima(data,var,model_fit):
     - Le modèle ARIMA doit être préalablement ajusté (fit) aux données historiques.
     - Le nombre de jours pour les prévisions est fixé à 14 par défaut (2 semaines), mais peut être ajusté en modifiant `forecast_steps`.
     """
+    import pandas as pd
+    import matplotlib.pyplot as plt
     forecast_steps = 14 #2semaines
     forecast = model_fit.forecast(steps=forecast_steps)
     # Visualisation des prévisions
@@ -146,6 +464,7 @@ def prevision_arima(data,var,model_fit):
     
 def residus(data,var,model_fit):
     
+    import matplotlib.pyplot as plt
     residuals = model_fit.resid
     plt.figure(figsize=(10, 6))
     plt.plot(residuals, label="Résidus")
@@ -155,6 +474,7 @@ def residus(data,var,model_fit):
     plt.show()
     
 
+@instrumenter
 def prevision_var(data,var,model_fit):
     """ 
     Génère des prévisions à court terme à l'aide d'un modèle VAR et visualise les résultats.
@@ -189,22 +509,436 @@ def prevision_var(data,var,model_fit):
     - La visualisation montre uniquement la variable cible spécifiée dans `var`.
     - Assurez-vous que `data` contient les mêmes variables que celles utilisées pour ajuster `model_fit`.
     """
+    import pandas as pd
+    import matplotlib.pyplot as plt
     forecast_steps = 14 #2semaines
-    forecast = model_fit.forecast(y=data.values, steps=forecast_steps)
-    forecast_df = pd.DataFrame(forecast, index=pd.date_range(max(data.index), periods=forecast_steps+1, freq='D')[1:], columns=data.columns)
+    with phase("prevision"):
+        # Seules les k_ar dernières observations servent à la récursion du VAR
+        forecast = model_fit.forecast(y=data.values[-model_fit.k_ar:], steps=forecast_steps)
+        forecast_dates = pd.date_range(max(data.index), periods=forecast_steps+1, freq='D')[1:]
+        forecast_df = pd.DataFrame(forecast, index=forecast_dates, columns=data.columns)
     # Visualisation des prévisions
-    plt.figure(figsize=(10, 6))
-    plt.plot(data.index,data[var], label="Historique")
-    plt.plot(pd.date_range(max(data.index), periods=forecast_steps+1, freq='D')[1:], 
-            forecast_df[var], label="Prévisions", color='red')
-    plt.title("Prévisions VAR {}".format(var))
-    plt.legend()
-    plt.show()
+    with phase("trace"):
+        plt.figure(figsize=(10, 6))
+        plt.plot(data.index,data[var], label="Historique")
+        plt.plot(forecast_dates, forecast_df[var], label="Prévisions", color='red')
+        plt.title("Prévisions VAR {}".format(var))
+        plt.legend()
+        plt.show()
     
     return forecast_df
 
 
 
+
+def _parametres_var(model_fit):
+    """
+    Extrait (coefs, constante) d'un VAR ajusté, ou None si le modèle comporte
+    une tendance autre qu'une constante ou des variables exogènes.
+    """
+    import numpy as np
+
+    if getattr(model_fit, "k_exog_user", 0) or model_fit.trend not in ("c", "n"):
+        return None
+    coefs = np.asarray(model_fit.coefs, dtype=float)
+    if model_fit.trend == "c":
+        constante = np.asarray(model_fit.coefs_exog, dtype=float).reshape(model_fit.neqs, -1)[:, 0]
+    else:
+        constante = np.zeros(model_fit.neqs)
+    return coefs, constante
+
+
+def _forecast_var_lot(coefs, constantes, fenetres, sigmas, steps, z):
+    """
+    Prévisions et écarts-types de prévision de M modèles VAR de même ordre p et de même dimension k.
+
+    coefs : (M, p, k, k), constantes : (M, k), fenetres : (M, p, k) dans l'ordre chronologique,
+    sigmas : (M, k, k). Renvoie prévisions, bornes inférieures et supérieures, chacune (M, steps, k).
+    """
+    import numpy as np
+
+    M, p, k = fenetres.shape
+    previsions = np.empty((M, steps, k))
+    historique = fenetres[:, ::-1]  # historique[:, j] = y_{t-1-j}
+    for h in range(steps):
+        y = constantes + np.einsum("mjab,mjb->ma", coefs, historique)
+        previsions[:, h] = y
+        historique = np.concatenate([y[:, None], historique[:, :-1]], axis=1)
+
+    # Représentation MA : Phi_0 = I, Phi_i = somme_j Phi_{i-j} A_j
+    phis = np.zeros((M, steps, k, k))
+    phis[:, 0] = np.eye(k)
+    for i in range(1, steps):
+        for j in range(1, min(i, p) + 1):
+            phis[:, i] += phis[:, i - j] @ coefs[:, j - 1]
+
+    # Erreur quadratique moyenne de prévision : somme cumulée de Phi_i Sigma Phi_i'
+    mse = np.cumsum(np.einsum("mhab,mbc,mhdc->mhad", phis, sigmas, phis), axis=1)
+    ecarts = z * np.sqrt(np.diagonal(mse, axis1=2, axis2=3))
+    return previsions, previsions - ecarts, previsions + ecarts
+
+
+def forecast_var(models, steps=14, alpha=0.05):
+    """
+    Prévisions ponctuelles et intervalles de prévision pour plusieurs modèles VAR, sans visualisation.
+
+    Parameters:
+    -----------
+    models : dict
+        Dictionnaire {nom: (model_fit, data)} où `model_fit` est un VAR ajusté et `data` le DataFrame
+        historique (index de dates journalières, mêmes colonnes que celles du modèle).
+    steps : int or list
+        Horizon maximal en jours (par défaut 14) : tous les horizons de 1 à `steps` sont renvoyés.
+        Une liste sélectionne explicitement les horizons à renvoyer (e.g. [1, 7, 14]).
+    alpha : float
+        Niveau des intervalles de prévision (par défaut 0.05, soit des intervalles à 95 %).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Table longue avec les colonnes 'modele', 'day', 'horizon', 'variable', 'prevision',
+        'borne_inf' et 'borne_sup'.
+
+    Description:
+    ------------
+    1. Seules les `k_ar` dernières lignes de chaque historique sont conservées : ce sont les seules
+       nécessaires à la récursion du VAR.
+    2. Les modèles de même ordre et de même dimension sont regroupés et prévus en un seul calcul
+       vectorisé ; les intervalles sont calculés à partir de la représentation MA du processus,
+       comme `forecast_interval` de statsmodels.
+    3. Les modèles avec tendance linéaire ou variables exogènes sont prévus un par un avec statsmodels.
+    """
+    import pandas as pd
+    import numpy as np
+    from scipy.stats import norm
+
+    horizons = list(range(1, steps + 1)) if np.isscalar(steps) else sorted(set(steps))
+    n_steps = horizons[-1]
+    selection = np.asarray(horizons) - 1
+    z = norm.ppf(1 - alpha / 2)
+
+    resultats = {}
+    lots = {}
+    for nom, (model_fit, data) in models.items():
+        parametres = _parametres_var(model_fit)
+        fenetre = np.asarray(data.values[len(data) - model_fit.k_ar:], dtype=float)
+        if parametres is None:
+            resultats[nom] = model_fit.forecast_interval(y=fenetre, steps=n_steps, alpha=alpha)
+        else:
+            lots.setdefault((model_fit.k_ar, model_fit.neqs), []).append((nom, parametres, fenetre, model_fit))
+
+    for membres in lots.values():
+        noms, parametres, fenetres, fits = zip(*membres)
+        previsions, bornes_inf, bornes_sup = _forecast_var_lot(
+            np.stack([coefs for coefs, _ in parametres]),
+            np.stack([constante for _, constante in parametres]),
+            np.stack(fenetres),
+            np.stack([np.asarray(fit.sigma_u, dtype=float) for fit in fits]),
+            n_steps,
+            z,
+        )
+        for m, nom in enumerate(noms):
+            resultats[nom] = (previsions[m], bornes_inf[m], bornes_sup[m])
+
+    tables = []
+    for nom, (model_fit, data) in models.items():
+        prevision, borne_inf, borne_sup = (np.asarray(a)[selection] for a in resultats[nom])
+        dates = pd.date_range(max(data.index), periods=n_steps + 1, freq='D')[1:][selection]
+        k = prevision.shape[1]
+        tables.append(pd.DataFrame({
+            "modele": nom,
+            "day": np.repeat(dates, k),
+            "horizon": np.repeat(horizons, k),
+            "variable": np.tile(data.columns, len(horizons)),
+            "prevision": prevision.ravel(),
+            "borne_inf": borne_inf.ravel(),
+            "borne_sup": borne_sup.ravel(),
+        }))
+    return pd.concat(tables, ignore_index=True)
+
+
+
+SEPARATEUR_VAR = "::"
+
+
+def pivot_var_regions(df_daily, polluants, regions=None):
+    """
+    Met en forme les données journalières de plusieurs régions pour un VAR multi-régions.
+
+    Parameters:
+    -----------
+    df_daily : pandas.DataFrame
+        Données journalières au format long (par exemple la sortie de `atmo`), avec les colonnes
+        'day', 'region' et les colonnes de `polluants`.
+    polluants : list
+        Polluants à modéliser conjointement.
+    regions : list, optional
+        Régions à inclure (par défaut, toutes les régions présentes).
+
+    Returns:
+    --------
+    pandas.DataFrame
+        DataFrame indexé par jour, avec une colonne par couple (région, polluant) nommée
+        'region::polluant'. Les jours manquants d'une région sont interpolés linéairement.
+    """
+    import pandas as pd
+    if regions is not None:
+        df_daily = df_daily[df_daily['region'].isin(regions)]
+    wide = df_daily.pivot_table(index=pd.to_datetime(df_daily['day']), columns='region', values=polluants)
+    wide = wide.swaplevel(axis=1).sort_index(axis=1)
+    wide.columns = [f"{region}{SEPARATEUR_VAR}{polluant}" for region, polluant in wide.columns]
+    wide.index.name = 'day'
+    return wide.asfreq('D').interpolate(limit_direction='both')
+
+
+class VARRegions:
+    """
+    VAR multi-régions estimé par moindres carrés pénalisés (ridge).
+
+    Expose la même interface de prévision que les résultats VAR de statsmodels
+    (`k_ar`, `neqs`, `coefs`, `coefs_exog`, `sigma_u`, `forecast`, `forecast_interval`),
+    ce qui permet de l'utiliser avec `prevision_var` et `forecast_var`.
+    """
+
+    trend = "c"
+    k_exog_user = 0
+
+    def __init__(self, coefs, constante, sigma_u, names, penalite, selection=None):
+        self.coefs = coefs
+        self.coefs_exog = constante[:, None]
+        self.sigma_u = sigma_u
+        self.names = list(names)
+        self.k_ar, self.neqs = coefs.shape[0], coefs.shape[1]
+        self.penalite = penalite
+        self.selection = selection
+
+    def forecast_interval(self, y, steps, alpha=0.05):
+        import numpy as np
+        from scipy.stats import norm
+
+        fenetre = np.asarray(y, dtype=float)[len(y) - self.k_ar:]
+        previsions, bornes_inf, bornes_sup = _forecast_var_lot(
+            self.coefs[None], self.coefs_exog[None, :, 0], fenetre[None], self.sigma_u[None],
+            steps, norm.ppf(1 - alpha / 2),
+        )
+        return previsions[0], bornes_inf[0], bornes_sup[0]
+
+    def forecast(self, y, steps):
+        return self.forecast_interval(y, steps)[0]
+
+
+def _ajuster_var_ridge(Y, p, penalite, debut):
+    """
+    Ajuste un VAR(p) ridge sur les observations Y[debut:], les variables étant standardisées
+    pour que la pénalité traite tous les polluants de la même façon.
+
+    Renvoie les coefficients (p, k, k) et la constante en unités d'origine, la matrice de covariance
+    des résidus et les critères d'information calculés avec le nombre effectif de paramètres.
+    """
+    import numpy as np
+
+    T, k = Y.shape
+    n = T - debut
+    moyenne, ecart = Y.mean(axis=0), Y.std(axis=0)
+    ecart[ecart == 0] = 1
+    Ys = (Y - moyenne) / ecart
+
+    Z = np.hstack([Ys[debut - j:T - j] for j in range(1, p + 1)])
+    cible = Ys[debut:]
+    z_moy, c_moy = Z.mean(axis=0), cible.mean(axis=0)
+    Zc, Cc = Z - z_moy, cible - c_moy
+
+    # Résolution par décomposition spectrale de la matrice de Gram : (Z'Z + lambda n I)^-1 Z'Y
+    valeurs, vecteurs = np.linalg.eigh(Zc.T @ Zc)
+    valeurs = np.clip(valeurs, 0, None)
+    B = vecteurs @ ((vecteurs.T @ (Zc.T @ Cc)) / (valeurs + penalite * n)[:, None])
+    ddl = (valeurs / (valeurs + penalite * n)).sum() if penalite > 0 else float(np.count_nonzero(valeurs > 1e-10))
+
+    residus = Cc - Zc @ B
+    # Retour aux unités d'origine : A_j[a, b] = s_a * A'_j[a, b] / s_b
+    coefs = B.reshape(p, k, k).transpose(0, 2, 1) * ecart[None, :, None] / ecart[None, None, :]
+    constante = moyenne + ecart * (c_moy - z_moy @ B) - np.einsum("jab,b->a", coefs, moyenne)
+    residus = residus * ecart
+    sigma_u = residus.T @ residus / max(n - ddl - 1, 1)
+
+    logdet = np.linalg.slogdet(residus.T @ residus / n)[1]
+    n_params = ddl * k
+    criteres = {
+        "aic": logdet + 2 * n_params / n,
+        "bic": logdet + np.log(n) * n_params / n,
+        "hqic": logdet + 2 * np.log(np.log(n)) * n_params / n,
+    }
+    return coefs, constante, sigma_u, criteres, ddl
+
+
+def fit_var_regions(data, maxlags=7, ic="aic", penalite=(0.01, 0.1, 1.0), n_jobs=None):
+    """
+    Ajuste un VAR multi-régions avec sélection automatique de l'ordre et de la pénalité.
+
+    Parameters:
+    -----------
+    data : pandas.DataFrame
+        Séries journalières mises en forme par `pivot_var_regions` (une colonne par couple
+        région × polluant).
+    maxlags : int
+        Ordre maximal testé (par défaut 7 jours).
+    ic : str
+        Critère d'information utilisé pour la sélection : 'aic', 'bic' ou 'hqic'.
+    penalite : float or tuple
+        Pénalité(s) ridge testée(s), exprimée(s) par observation. 0 correspond aux moindres carrés
+        ordinaires, réservés aux petits systèmes.
+    n_jobs : int or None
+        Nombre de threads utilisés pour la recherche. None ou -1 utilise tous les cœurs.
+
+    Returns:
+    --------
+    VARRegions
+        Modèle ajusté avec l'ordre et la pénalité retenus. L'attribut `selection` contient la table
+        des critères pour chaque couple (ordre, pénalité) testé.
+
+    Description:
+    ------------
+    1. Tous les couples (ordre, pénalité) sont estimés en parallèle sur le même échantillon
+       (les `maxlags` premières observations sont écartées), comme `select_order` de statsmodels.
+    2. L'estimateur ridge reste bien conditionné lorsque le nombre de paramètres (k² p) dépasse
+       le nombre d'observations ; le coût est celui d'une décomposition de la matrice de Gram
+       (k p × k p), indépendant de la longueur de l'historique au-delà du produit Z'Z.
+    3. Les critères utilisent le nombre effectif de paramètres du ridge (trace de la matrice chapeau).
+    4. Le modèle retenu est réestimé sur tout l'historique disponible.
+
+    Notes:
+    ------
+    - Les colonnes gardent la forme 'region::polluant', ce qui permet de relire les interactions
+      entre régions dans `coefs` (transport de pollution d'une région à l'autre).
+    """
+    import pandas as pd
+    import numpy as np
+    from .parallele import executer_taches
+
+    Y = np.asarray(data.values, dtype=float)
+    penalites = (penalite,) if np.isscalar(penalite) else tuple(penalite)
+    grille = [(p, lam) for p in range(1, maxlags + 1) for lam in penalites]
+
+    def evaluer(candidat):
+        p, lam = candidat
+        criteres, ddl = _ajuster_var_ridge(Y, p, lam, maxlags)[3:]
+        return {"ordre": p, "penalite": lam, "ddl": ddl, **criteres}
+
+    selection = pd.DataFrame(executer_taches(evaluer, grille, n_jobs, threads=True))
+
+    meilleur = selection.loc[selection[ic].idxmin()]
+    p, lam = int(meilleur["ordre"]), float(meilleur["penalite"])
+    coefs, constante, sigma_u = _ajuster_var_ridge(Y, p, lam, p)[:3]
+    return VARRegions(coefs, constante, sigma_u, data.columns, lam, selection=selection)
+
+
+def _simuler_var(model_fit, data, steps, n_paths, rng):
+    """
+    Simule `n_paths` trajectoires futures d'un VAR, toutes les trajectoires avançant ensemble
+    d'un pas à l'autre. Renvoie un tableau (n_paths, steps, k).
+    """
+    import numpy as np
+
+    parametres = _parametres_var(model_fit)
+    if parametres is None:
+        raise ValueError("La simulation ne gère que les VAR avec constante et sans variable exogène")
+    coefs, constante = parametres
+    p, k = model_fit.k_ar, model_fit.neqs
+
+    chocs = rng.standard_normal((n_paths, steps, k)) @ np.linalg.cholesky(np.asarray(model_fit.sigma_u, dtype=float)).T
+    fenetre = np.asarray(data.values[len(data) - p:], dtype=float)
+    historique = np.repeat(fenetre[::-1][None], n_paths, axis=0)  # historique[:, j] = y_{t-1-j}
+    chemins = np.empty((n_paths, steps, k))
+    for h in range(steps):
+        y = constante + np.einsum("jab,njb->na", coefs, historique) + chocs[:, h]
+        chemins[:, h] = y
+        historique = np.concatenate([y[:, None], historique[:, :-1]], axis=1)
+    return chemins
+
+
+def prevision_atmo_probabiliste(models, steps=14, n_paths=5000, seed=None):
+    """
+    Prévision probabiliste de l'indice ATMO par simulation de Monte-Carlo.
+
+    Parameters:
+    -----------
+    models : dict
+        Dictionnaire {region: (modele, data)} où :
+        - `modele` est un VAR ajusté (statsmodels ou `fit_var_regions`) sur les concentrations
+          journalières, ou un dictionnaire {polluant: modèle ARIMA ajusté} ;
+        - `data` est l'historique utilisé pour l'ajustement (index de dates ou colonne 'day').
+        Pour un VAR multi-régions, les colonnes 'region::polluant' sont réparties par région et la
+        clé du dictionnaire est ignorée.
+    steps : int
+        Horizon de prévision en jours (par défaut 14).
+    n_paths : int
+        Nombre de trajectoires simulées par modèle (par défaut 5000).
+    seed : int, optional
+        Graine du générateur aléatoire.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Une ligne par région et par jour avec 'region', 'day', 'horizon', la probabilité de chaque
+        catégorie de `CATEGORIES_ATMO` ('Très bon', ..., 'Très mauvais') et 'indice_median'.
+
+    Description:
+    ------------
+    1. Les trajectoires sont simulées toutes ensemble : chocs gaussiens corrélés selon la covariance
+       des résidus pour un VAR (trajectoires jointes des polluants), `simulate` de statsmodels pour
+       des ARIMA (polluants simulés indépendamment).
+    2. Les concentrations simulées (tronquées à 0) sont converties en sous-indices par les seuils de
+       `SEUILS_ATMO`, sur le tableau complet des trajectoires.
+    3. L'indice ATMO de chaque trajectoire est le maximum des sous-indices disponibles ; les
+       probabilités sont les fréquences de chaque catégorie parmi les trajectoires.
+
+    Notes:
+    ------
+    - Seuls les polluants présents à la fois dans le modèle et dans `SEUILS_ATMO` contribuent à l'indice.
+    """
+    import pandas as pd
+    import numpy as np
+    from .indice import CATEGORIES_ATMO, SEUILS_ATMO, categorie_array, subindex_array
+
+    rng = np.random.default_rng(seed)
+    simulations = {}  # region -> {polluant: (n_paths, steps)}
+    dernier_jour = {}
+    for cle, (modele, data) in models.items():
+        fin = max(data['day']) if 'day' in getattr(data, 'columns', []) else max(data.index)
+        if isinstance(modele, dict):
+            for polluant, arima_fit in modele.items():
+                chemins = arima_fit.simulate(nsimulations=steps, repetitions=n_paths, anchor='end', random_state=rng)
+                simulations.setdefault(cle, {})[polluant] = np.asarray(chemins).reshape(steps, n_paths).T
+            dernier_jour[cle] = fin
+        else:
+            chemins = _simuler_var(modele, data, steps, n_paths, rng)
+            for j, nom in enumerate(data.columns):
+                region, polluant = nom.split(SEPARATEUR_VAR, 1) if SEPARATEUR_VAR in nom else (cle, nom)
+                simulations.setdefault(region, {})[polluant] = chemins[:, :, j]
+                dernier_jour[region] = fin
+
+    libelles = [libelle for libelle, _, _ in CATEGORIES_ATMO]
+    tables = []
+    for region, polluants in simulations.items():
+        sous_indices = [
+            subindex_array(np.clip(chemins, 0, None), polluant)
+            for polluant, chemins in polluants.items()
+            if polluant in SEUILS_ATMO
+        ]
+        if not sous_indices:
+            continue
+        indices = np.max(sous_indices, axis=0)  # (n_paths, steps)
+        categories = categorie_array(indices)
+        probabilites = (categories[..., None] == np.arange(len(libelles))).mean(axis=0)  # (steps, 6)
+        table = pd.DataFrame(probabilites, columns=libelles)
+        table.insert(0, "region", region)
+        table.insert(1, "day", pd.date_range(pd.Timestamp(dernier_jour[region]), periods=steps + 1, freq='D')[1:])
+        table.insert(2, "horizon", np.arange(1, steps + 1))
+        table["indice_median"] = np.median(indices, axis=0)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
 def indice_eval (polluants,forecast,data,test) :
     """
     Calcule un indice synthétique d'évaluation des erreurs de prévision pour plusieurs polluants, 
@@ -250,6 +984,7 @@ def indice_eval (polluants,forecast,data,test) :
     print(indice)
     0.2451
     """
+    from sklearn.metrics import root_mean_squared_error
     indice = 0 
     sum_inv_mean = 0
     for col in polluants : 
@@ -264,60 +999,268 @@ def indice_eval (polluants,forecast,data,test) :
 
 
 
-def train_predict_visualize(train_data, historical_data, features_columns, target_column, future_start, future_end):
+def _random_forest(n_jobs, random_state, **params):
+    from sklearn.ensemble import RandomForestRegressor
+    params.setdefault("n_estimators", 100)
+    return RandomForestRegressor(random_state=random_state, n_jobs=n_jobs, **params)
+
+
+def _hist_gradient_boosting(n_jobs, random_state, **params):
+    # Parallélisé par OpenMP : n_jobs n'est pas un paramètre de l'estimateur
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(random_state=random_state, **params)
+
+
+# Moteurs de régression : nom -> fabrique(n_jobs, random_state, **params)
+# D'autres moteurs peuvent être ajoutés à ce dictionnaire.
+REGRESSEURS = {
+    "random_forest": _random_forest,
+    "hist_gradient_boosting": _hist_gradient_boosting,
+}
+
+
+def _creer_regresseur(engine, n_jobs, random_state, **params):
     """
-    Entraîne un modèle Random Forest, prédit les valeurs futures, visualise les résultats, 
-    et calcule les importances des caractéristiques.
+    Instancie un régresseur à partir d'un nom de `REGRESSEURS`, d'une fabrique ou d'un estimateur scikit-learn.
+    """
+    from sklearn.base import clone
+
+    if isinstance(engine, str):
+        if engine not in REGRESSEURS:
+            raise ValueError(f"Moteur inconnu : {engine}. Choix possibles : {list(REGRESSEURS)}")
+        return REGRESSEURS[engine](n_jobs, random_state, **params)
+    if hasattr(engine, "fit"):
+        return clone(engine).set_params(**params)
+    return engine(n_jobs, random_state, **params)
+
+
+def train_model(train_data, features_columns, target_column, engine="random_forest", n_jobs=-1, test_size=0.2, random_state=42, split="aleatoire", date_column="day", **params):
+    """
+    Entraîne et évalue un régresseur, sans affichage.
 
     Parameters:
     - train_data (DataFrame): Données d'entraînement contenant les features et la cible.
-    - historical_data (DataFrame): Données historiques contenant les valeurs observées de la cible.
     - features_columns (list): Liste des colonnes des variables explicatives (features).
     - target_column (str): Nom de la colonne cible (target).
-    - future_start (str): Date de début pour les données futures (format 'YYYY-MM-DD').
-    - future_end (str): Date de fin pour les données futures (format 'YYYY-MM-DD').
+    - engine (str, callable ou estimateur): Moteur de régression, nom de `REGRESSEURS`
+      ('random_forest' par défaut, 'hist_gradient_boosting'), fabrique ou estimateur scikit-learn.
+    - n_jobs (int): Nombre de cœurs utilisés par le moteur (-1 pour tous).
+    - test_size (float): Part des données réservée à l'évaluation.
+    - random_state (int): Graine du découpage et du moteur.
+    - split (str): 'aleatoire' (découpage mélangé, par défaut) ou 'temporel' : les derniers jours
+      de `date_column` forment l'ensemble de test, sans fuite du futur dans l'entraînement.
+    - date_column (str): Colonne des dates utilisée par le découpage temporel.
+    - params: Hyperparamètres transmis au moteur.
 
     Returns:
-    - predictions (DataFrame): DataFrame contenant les prédictions pour la période future.
-    - coeff_importances (Series): Importances des caractéristiques du modèle Random Forest.
+    - resultat (dict): 'modele' (estimateur entraîné), 'mse', 'temps_fit_s', 'temps_predict_s'
+      et 'importances' (Series, ou None si le moteur n'en fournit pas).
     """
     import pandas as pd
-    import numpy as np
+    import time
     from sklearn.model_selection import train_test_split
-    from sklearn.ensemble import RandomForestRegressor
     from sklearn.metrics import mean_squared_error
-    import matplotlib.pyplot as plt
-    np.random.seed(42)
-    # Séparation des variables features et target
+
     features = train_data[features_columns]
     target = train_data[target_column]
+    if split == "temporel":
+        jours = pd.to_datetime(train_data[date_column])
+        coupure = jours.drop_duplicates().sort_values().quantile(1 - test_size)
+        test = (jours > coupure).to_numpy()
+        X_train, X_test, y_train, y_test = features[~test], features[test], target[~test], target[test]
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=test_size, random_state=random_state)
 
-    # Entraînement du modèle
-    X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=0.2, random_state=42)
-    rf = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf.fit(X_train, y_train)
-    
-    # Évaluation sur l'ensemble de test
-    y_pred = rf.predict(X_test)
-    mse = mean_squared_error(y_test, y_pred)
-    print(f'Mean Squared Error for {target_column}: {mse}')
+    modele = _creer_regresseur(engine, n_jobs, random_state, **params)
+    debut = time.perf_counter()
+    modele.fit(X_train, y_train)
+    temps_fit = time.perf_counter() - debut
 
-    # Calcul des importances des caractéristiques
-    pertinence = rf.feature_importances_
-    coeff_importances = pd.Series(pertinence, index=X_train.columns)
-    print("\nImportances des caractéristiques :")
-    print(coeff_importances.sort_values(ascending=False))
+    debut = time.perf_counter()
+    y_pred = modele.predict(X_test)
+    temps_predict = time.perf_counter() - debut
 
-    # Génération des données synthétiques futures
-    future_features = pd.DataFrame({
-        col: np.random.normal(features[col].mean(), features[col].std(), len(pd.date_range(start=future_start, end=future_end)))
+    importances = getattr(modele, "feature_importances_", None)
+    return {
+        "modele": modele,
+        "mse": mean_squared_error(y_test, y_pred),
+        "temps_fit_s": temps_fit,
+        "temps_predict_s": temps_predict,
+        "importances": None if importances is None else pd.Series(importances, index=features_columns),
+    }
+
+
+def predict_future(modele, train_data, features_columns, target_column, future_start, future_end, seed=42):
+    """
+    Prédit la cible sur une période future à partir de features synthétiques tirées selon une loi
+    normale de moyenne et d'écart-type historiques.
+
+    Returns:
+    - predictions (DataFrame): Features synthétiques et prédictions, indexées par les dates futures.
+    """
+    import pandas as pd
+    import numpy as np
+
+    np.random.seed(seed)
+    features = train_data[features_columns]
+    dates = pd.date_range(start=future_start, end=future_end)
+    predictions = pd.DataFrame({
+        col: np.random.normal(features[col].mean(), features[col].std(), len(dates))
         for col in features_columns
-    }, index=pd.date_range(start=future_start, end=future_end))
-    
-    # Prédictions pour les données futures
-    predictions = pd.DataFrame(index=future_features.index)
-    predictions[target_column] = rf.predict(future_features)
-    
+    }, index=dates)
+    predictions[target_column] = modele.predict(predictions[features_columns])
+    return predictions
+
+
+def compare_regresseurs(train_data, features_columns, target_column, engines=("random_forest", "hist_gradient_boosting"), n_jobs=-1, random_state=42):
+    """
+    Compare plusieurs moteurs de régression sur le même découpage des données.
+
+    Returns:
+    - comparaison (DataFrame): Une ligne par moteur avec 'mse', 'temps_fit_s' et 'temps_predict_s'.
+    """
+    import pandas as pd
+    lignes = []
+    for engine in engines:
+        resultat = train_model(train_data, features_columns, target_column, engine=engine, n_jobs=n_jobs, random_state=random_state)
+        lignes.append({
+            "engine": engine if isinstance(engine, str) else type(resultat["modele"]).__name__,
+            "mse": resultat["mse"],
+            "temps_fit_s": resultat["temps_fit_s"],
+            "temps_predict_s": resultat["temps_predict_s"],
+        })
+    return pd.DataFrame(lignes)
+
+
+def _evaluer_pli(args):
+    """
+    Entraîne un candidat sur un pli temporel et renvoie ses métriques.
+    """
+    import time
+    import numpy as np
+    from sklearn.metrics import mean_squared_error, mean_absolute_error
+
+    candidat, params, pli, X_train, y_train, X_test, y_test, engine, random_state, periode = args
+    modele = _creer_regresseur(engine, 1, random_state, **params)
+    debut = time.perf_counter()
+    modele.fit(X_train, y_train)
+    temps_fit = time.perf_counter() - debut
+    y_pred = modele.predict(X_test)
+    mse = mean_squared_error(y_test, y_pred)
+    return {
+        "candidat": candidat,
+        "params": params,
+        "pli": pli,
+        "debut_test": periode[0],
+        "fin_test": periode[1],
+        "n_train": len(X_train),
+        "n_test": len(X_test),
+        "mse": mse,
+        "rmse": np.sqrt(mse),
+        "mae": mean_absolute_error(y_test, y_pred),
+        "temps_fit_s": temps_fit,
+    }
+
+
+def cv_temporelle(train_data, features_columns, target_column, n_splits=5, window="expanding", taille_fenetre=None, test_size=None, param_grid=None, engine="random_forest", date_column="day", n_jobs=None, random_state=42):
+    """
+    Validation croisée temporelle d'un régresseur, parallélisée sur les plis et les hyperparamètres.
+
+    Parameters:
+    - train_data (DataFrame): Données contenant les features, la cible et la colonne `date_column`.
+    - features_columns (list): Colonnes des variables explicatives.
+    - target_column (str): Colonne cible.
+    - n_splits (int): Nombre de plis (par défaut 5).
+    - window (str): 'expanding' (l'entraînement part toujours du début) ou 'sliding'
+      (l'entraînement se limite aux `taille_fenetre` derniers jours avant le pli de test).
+    - taille_fenetre (int ou None): Nombre de jours d'entraînement en mode 'sliding'.
+    - test_size (int ou None): Nombre de jours par pli de test (par défaut, déduit de `n_splits`).
+    - param_grid (dict ou None): Grille d'hyperparamètres {nom: liste de valeurs} ; tous les
+      candidats sont évalués sur les mêmes plis.
+    - engine: Moteur de régression (voir `train_model`).
+    - date_column (str): Colonne des dates ; les plis sont découpés par jour, de sorte que toutes
+      les régions d'un même jour tombent dans le même pli.
+    - n_jobs (int ou None): Nombre de processus. None ou -1 utilise tous les cœurs, 1 exécute en série.
+    - random_state (int): Graine du moteur.
+
+    Returns:
+    - resultats (DataFrame): Une ligne par (candidat, pli) avec 'params', 'debut_test', 'fin_test',
+      'n_train', 'n_test', 'mse', 'rmse', 'mae' et 'temps_fit_s'. Le meilleur candidat s'obtient par
+      `resultats.groupby('candidat')['rmse'].mean().idxmin()`.
+    """
+    import pandas as pd
+    from .parallele import executer_taches
+    from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+
+    if window not in ("expanding", "sliding"):
+        raise ValueError("window doit valoir 'expanding' ou 'sliding'")
+    if window == "sliding" and taille_fenetre is None:
+        raise ValueError("taille_fenetre est requis en mode 'sliding'")
+
+    jours = pd.to_datetime(train_data[date_column])
+    jours_uniques = jours.drop_duplicates().sort_values().to_numpy()
+    splitter = TimeSeriesSplit(
+        n_splits=n_splits,
+        max_train_size=taille_fenetre if window == "sliding" else None,
+        test_size=test_size,
+    )
+
+    features = train_data[features_columns].to_numpy()
+    target = train_data[target_column].to_numpy()
+    plis = []
+    for pli, (idx_train, idx_test) in enumerate(splitter.split(jours_uniques)):
+        train = jours.isin(jours_uniques[idx_train]).to_numpy()
+        test = jours.isin(jours_uniques[idx_test]).to_numpy()
+        periode = (jours_uniques[idx_test[0]], jours_uniques[idx_test[-1]])
+        plis.append((pli, features[train], target[train], features[test], target[test], periode))
+
+    candidats = list(ParameterGrid(param_grid or {}))
+    taches = [
+        (candidat, params, pli, X_train, y_train, X_test, y_test, engine, random_state, periode)
+        for candidat, params in enumerate(candidats)
+        for pli, X_train, y_train, X_test, y_test, periode in plis
+    ]
+    return pd.DataFrame(executer_taches(_evaluer_pli, taches, n_jobs))
+
+
+def _train_model_tache(args):
+    cle, donnees, features_columns, target_column, engine, params = args
+    resultat = train_model(donnees, features_columns, target_column, engine=engine, n_jobs=1, **params)
+    return cle, resultat
+
+
+def train_models(data, features_columns, targets, by="region", engine="random_forest", n_jobs=None, **params):
+    """
+    Entraîne un modèle par cible (polluant) et par groupe (région), en parallèle et sans affichage.
+
+    Parameters:
+    - data (DataFrame): Données au format long contenant les features, les cibles et la colonne `by`.
+    - features_columns (list): Colonnes des variables explicatives.
+    - targets (list): Colonnes cibles, un modèle par cible et par groupe.
+    - by (str): Colonne de regroupement (par défaut 'region').
+    - engine: Moteur de régression (voir `train_model`).
+    - n_jobs (int ou None): Nombre de processus ; chaque modèle est entraîné sur un seul cœur.
+      None ou -1 utilise tous les cœurs, 1 exécute en série.
+    - params: Hyperparamètres transmis au moteur.
+
+    Returns:
+    - resultats (dict): {(groupe, cible): résultat de `train_model`}.
+    """
+    from .parallele import executer_taches
+
+    taches = [
+        ((groupe, target), donnees[features_columns + [target]].dropna(), features_columns, target, engine, params)
+        for groupe, donnees in data.groupby(by, sort=True)
+        for target in targets
+    ]
+    return dict(executer_taches(_train_model_tache, taches, n_jobs))
+
+
+def plot_predictions(predictions, historical_data, target_column):
+    """
+    Trace les prédictions futures, seules puis face à l'historique de la cible.
+    """
+    import matplotlib.pyplot as plt
     # Visualisation des prédictions futures
     plt.figure(figsize=(14, 4))
     plt.plot(predictions.index, predictions[target_column], label=f'Predicted {target_column}', linestyle='--', color='red')
@@ -327,12 +1270,7 @@ def train_predict_visualize(train_data, historical_data, features_columns, targe
     plt.legend()
     plt.grid(True)
     plt.show()
-    
-    # Combinaison des données historiques et des prédictions
-    new_data = future_features.copy()
-    new_data[target_column] = predictions[target_column]
-    combined_data = pd.concat([historical_data[['day', target_column]], new_data.reset_index()], ignore_index=True)
-    
+
     # Visualisation historique vs prédictions
     plt.figure(figsize=(14, 4))
     plt.plot(historical_data['day'], historical_data[target_column], label='Valeurs Historiques', color='blue')
@@ -343,6 +1281,40 @@ def train_predict_visualize(train_data, historical_data, features_columns, targe
     plt.legend()
     plt.grid(True)
     plt.show()
-    
-    return predictions
 
+
+@instrumenter
+def train_predict_visualize(train_data, historical_data, features_columns, target_column, future_start, future_end, n_jobs=-1):
+    """
+    Entraîne un modèle Random Forest, prédit les valeurs futures, visualise les résultats, 
+    et calcule les importances des caractéristiques.
+
+    Parameters:
+    - train_data (DataFrame): Données d'entraînement contenant les features et la cible.
+    - historical_data (DataFrame): Données historiques contenant les valeurs observées de la cible.
+    - features_columns (list): Liste des colonnes des variables explicatives (features).
+    - target_column (str): Nom de la colonne cible (target).
+    - future_start (str): Date de début pour les données futures (format 'YYYY-MM-DD').
+    - future_end (str): Date de fin pour les données futures (format 'YYYY-MM-DD').
+    - n_jobs (int): Nombre de cœurs utilisés pour l'entraînement (-1 pour tous).
+
+    Returns:
+    - predictions (DataFrame): DataFrame contenant les prédictions pour la période future.
+
+    Notes:
+    - Enveloppe interactive (affichages et figure) de `train_model`, `predict_future` et
+      `plot_predictions` : dans les boucles et les processus de calcul, appeler directement ces
+      fonctions.
+    """
+    with phase("ajustement"):
+        resultat = train_model(train_data, features_columns, target_column, engine="random_forest", n_jobs=n_jobs)
+    print(f'Mean Squared Error for {target_column}: {resultat["mse"]}')
+    print("\nImportances des caractéristiques :")
+    print(resultat["importances"].sort_values(ascending=False))
+
+    with phase("prevision") as p:
+        predictions = predict_future(resultat["modele"], train_data, features_columns, target_column, future_start, future_end)
+        p.lignes(len(predictions))
+    with phase("trace"):
+        plot_predictions(predictions, historical_data, target_column)
+    return predictions[[target_column]]
@@ -0,0 +1,53 @@
+import os
+
+
+def nombre_processus(n_jobs):
+    """
+    Convertit `n_jobs` en nombre de processus, avec la convention de scikit-learn : None ou -1
+    utilise tous les cœurs, -2 tous sauf un, etc. ; 1 exécute en série.
+    """
+    n_coeurs = os.cpu_count() or 1
+    if n_jobs is None:
+        return n_coeurs
+    if n_jobs == 0:
+        raise ValueError("n_jobs doit être non nul")
+    if n_jobs < 0:
+        return max(1, n_coeurs + 1 + n_jobs)
+    return n_jobs
+
+
+def executer_taches(fonction, taches, n_jobs=None, chunksize=None, initializer=None, initargs=(), threads=False):
+    """
+    Applique `fonction` à chaque tâche, en série ou dans un pool, et renvoie la liste des résultats
+    dans l'ordre des tâches.
+
+    Parameters:
+    -----------
+    fonction : callable
+        Fonction à un argument (la tâche), définie au niveau d'un module pour un pool de processus.
+    taches : iterable
+        Tâches à traiter.
+    n_jobs : int or None
+        Voir `nombre_processus`. En série (1, ou une seule tâche), aucun pool n'est créé.
+    chunksize : int, optional
+        Tâches envoyées à la fois à chaque processus. Par défaut, environ 4 paquets par processus.
+    initializer, initargs :
+        Initialisation appelée une fois par processus, ou une fois dans le processus courant en série.
+    threads : bool
+        Utilise un pool de threads (calculs qui libèrent le GIL) plutôt que de processus.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    taches = list(taches)
+    n = min(nombre_processus(n_jobs), max(1, len(taches)))
+    if n == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [fonction(tache) for tache in taches]
+    if threads:
+        with ThreadPoolExecutor(max_workers=n, initializer=initializer, initargs=initargs) as executor:
+            return list(executor.map(fonction, taches))
+    if chunksize is None:
+        chunksize = max(1, len(taches) // (4 * n))
+    with ProcessPoolExecutor(max_workers=n, initializer=initializer, initargs=initargs) as executor:
+        return list(executor.map(fonction, taches, chunksize=chunksize))
@@ -0,0 +1,357 @@
+"""
+Pipeline quotidien par étapes avec cache : récupération des données → jointure → ATMO → prévisions → cartes.
+
+Usage : python -m scripts.pipeline config.json [--cache .pipeline] [--jobs 4] [--cibles atmo ...] [--forcer ...]
+
+Chaque étape est identifiée par une clé calculée à partir de ses paramètres et du contenu de ses
+entrées. Une étape dont la clé n'a pas changé depuis la dernière exécution n'est pas recalculée ;
+une étape recalculée dont la sortie est identique à la précédente ne déclenche pas ses successeurs.
+Les étapes indépendantes (mois de données, prévisions par polluant) s'exécutent en parallèle.
+"""
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import time
+
+
+# --- Étapes -----------------------------------------------------------------------------------
+# Chaque étape reçoit le dictionnaire {nom de dépendance: sortie} puis ses paramètres.
+
+def _etape_recup(entrees, start_date, end_date, url, variables, region_centroides):
+    from .api import recup_data
+
+    df = recup_data(start_date, end_date, url, variables, [tuple(r) for r in region_centroides])
+    # `recup_data` ignore les régions en échec : l'étape échoue pour ne pas figer un mois incomplet
+    manquantes = sorted({region for region, _, _ in region_centroides} - set(df["region"].unique()))
+    if manquantes:
+        raise RuntimeError(f"Régions non récupérées du {start_date} au {end_date} : {', '.join(manquantes)}")
+    return df
+
+
+def _etape_jointure(entrees):
+    import pandas as pd
+
+    air = pd.concat([df for nom, df in sorted(entrees.items()) if nom.startswith("air_")], ignore_index=True)
+    climat = pd.concat([df for nom, df in sorted(entrees.items()) if nom.startswith("climat_")], ignore_index=True)
+    climat = climat.drop(columns=["day", "longitude", "latitude"])
+    return air.merge(climat, on=["date", "region"], how="inner")
+
+
+def _etape_atmo(entrees, regions):
+    from .indice import atmo
+    df = entrees["jointure"]
+    return atmo(df, regions if regions is not None else df["region"].unique())
+
+
+def _etape_prevision(entrees, polluant, ordre, engine, jours):
+    import pandas as pd
+    from .modele import fit_arima
+
+    daily = entrees["atmo"]
+    previsions = []
+    for region, donnees in daily.groupby("region"):
+        serie = donnees.assign(day=pd.to_datetime(donnees["day"])).sort_values("day").set_index("day")[[polluant]]
+        serie = serie.asfreq("D")
+        model_fit = fit_arima(serie, polluant, *ordre, engine=engine)
+        forecast = model_fit.forecast(steps=jours)
+        previsions.append(pd.DataFrame({
+            "region": region,
+            "day": pd.date_range(serie.index[-1], periods=jours + 1, freq="D")[1:],
+            polluant: forecast.to_numpy(),
+        }))
+    return pd.concat(previsions, ignore_index=True)
+
+
+def _etape_cartes(entrees, france, dossier, jours, dpi, empreinte_france):
+    # `empreinte_france` ne sert qu'à la clé de l'étape : modifier le fichier force un nouveau rendu
+    import geopandas as gpd
+    import pandas as pd
+    from .dataviz import render_atmo_maps
+
+    daily = entrees["atmo"]
+    fin = pd.to_datetime(daily["day"]).max()
+    debut = fin - pd.Timedelta(days=jours - 1)
+    return render_atmo_maps(daily, gpd.read_file(france), dossier, start_date=debut, end_date=fin, dpi=dpi, n_jobs=1)
+
+
+# --- Construction du pipeline -------------------------------------------------------------------
+
+def _mois(start_date, end_date):
+    """
+    Découpe [start_date, end_date] en intervalles mensuels (début, fin) au format 'YYYY-MM-DD'.
+    """
+    import pandas as pd
+
+    debut, fin = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    intervalles = []
+    while debut <= fin:
+        fin_mois = min(debut + pd.offsets.MonthEnd(0), fin)
+        intervalles.append((debut.strftime("%Y-%m-%d"), fin_mois.strftime("%Y-%m-%d")))
+        debut = fin_mois + pd.Timedelta(days=1)
+    return intervalles
+
+
+def construire_pipeline(config):
+    """
+    Construit le graphe des étapes à partir d'une configuration.
+
+    Parameters:
+    -----------
+    config : dict
+        Clés attendues :
+        - 'start_date', 'end_date' : période des données ('YYYY-MM-DD') ; 'end_date' vaut par
+          défaut la date du jour, pour un rafraîchissement quotidien ;
+        - 'url_air', 'variables_air', 'url_climat', 'variables_climat' : sources Open-Meteo ;
+        - 'region_centroides' : liste de triplets (région, longitude, latitude), ou chemin du JSON
+          écrit par `region_centroides` ;
+        - 'polluants' : polluants à prévoir ; 'ordre_arima' (par défaut [1, 0, 1]) ;
+          'engine' (par défaut 'mle') ; 'jours_prevision' (par défaut 14) ;
+        - optionnelles : 'regions' (filtre de `atmo`), 'france' (fichier géographique des régions)
+          et 'dossier_cartes', 'jours_cartes' (par défaut 14), 'dpi' pour le rendu des cartes.
+
+    Returns:
+    --------
+    dict
+        {nom: (fonction, dépendances, paramètres)}.
+
+    Notes:
+    ------
+    - Les récupérations sont découpées par mois : seuls les mois dont la période change (en
+      pratique, le mois en cours) sont récupérés de nouveau lors d'un rafraîchissement quotidien.
+    """
+    centroides = config["region_centroides"]
+    if isinstance(centroides, str):
+        from .spatial import region_centroides
+        centroides = region_centroides(None, centroides)
+    centroides = [list(triplet) for triplet in centroides]
+
+    etapes = {}
+    end_date = config.get("end_date") or datetime.date.today().isoformat()
+    for debut, fin in _mois(config["start_date"], end_date):
+        for source in ("air", "climat"):
+            etapes[f"{source}_{debut[:7]}"] = (_etape_recup, [], {
+                "start_date": debut,
+                "end_date": fin,
+                "url": config[f"url_{source}"],
+                "variables": list(config[f"variables_{source}"]),
+                "region_centroides": centroides,
+            })
+    etapes["jointure"] = (_etape_jointure, sorted(etapes), {})
+    etapes["atmo"] = (_etape_atmo, ["jointure"], {"regions": config.get("regions")})
+    for polluant in config.get("polluants", []):
+        etapes[f"prevision_{polluant}"] = (_etape_prevision, ["atmo"], {
+            "polluant": polluant,
+            "ordre": list(config.get("ordre_arima", [1, 0, 1])),
+            "engine": config.get("engine", "mle"),
+            "jours": config.get("jours_prevision", 14),
+        })
+    if config.get("france") and config.get("dossier_cartes"):
+        etapes["cartes"] = (_etape_cartes, ["atmo"], {
+            "france": config["france"],
+            "dossier": config["dossier_cartes"],
+            "jours": config.get("jours_cartes", 14),
+            "dpi": config.get("dpi", 100),
+            "empreinte_france": _empreinte_fichier(config["france"]),
+        })
+    return etapes
+
+
+def _empreinte_fichier(chemin):
+    """
+    Empreinte (sha1) du contenu d'un fichier géographique, fichiers annexes d'un shapefile compris.
+    """
+    base, extension = os.path.splitext(chemin)
+    fichiers = [chemin]
+    if extension.lower() == ".shp":
+        fichiers += [base + annexe for annexe in (".shx", ".dbf", ".prj", ".cpg") if os.path.exists(base + annexe)]
+    h = hashlib.sha1()
+    for fichier in fichiers:
+        with open(fichier, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+# --- Exécution ----------------------------------------------------------------------------------
+
+def _cle_etape(nom, fonction, params, empreintes_entrees):
+    h = hashlib.sha1(f"{nom}|{fonction.__module__}.{fonction.__name__}".encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    h.update(json.dumps(empreintes_entrees, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _executer_etape(fonction, params, chemins_entrees, chemin_sortie):
+    """
+    Exécute une étape dans un processus de travail : lit ses entrées depuis le cache, écrit sa
+    sortie et renvoie l'empreinte de son contenu et sa durée.
+    """
+    debut = time.perf_counter()
+    entrees = {}
+    for nom, chemin in chemins_entrees.items():
+        with open(chemin, "rb") as f:
+            entrees[nom] = pickle.load(f)
+    contenu = pickle.dumps(fonction(entrees, **params), protocol=pickle.HIGHEST_PROTOCOL)
+    with open(chemin_sortie + ".tmp", "wb") as f:
+        f.write(contenu)
+    os.replace(chemin_sortie + ".tmp", chemin_sortie)
+    return hashlib.sha1(contenu).hexdigest(), time.perf_counter() - debut
+
+
+def _dependances_transitives(etapes, cibles):
+    a_visiter, gardees = list(cibles), set()
+    while a_visiter:
+        nom = a_visiter.pop()
+        if nom not in gardees:
+            gardees.add(nom)
+            a_visiter.extend(etapes[nom][1])
+    return gardees
+
+
+def _descendants(etapes, nom):
+    a_visiter, trouves = [nom], set()
+    while a_visiter:
+        courant = a_visiter.pop()
+        for suivant, (_, dependances, _) in etapes.items():
+            if courant in dependances and suivant not in trouves:
+                trouves.add(suivant)
+                a_visiter.append(suivant)
+    return trouves
+
+
+def executer_pipeline(etapes, cache_dir=".pipeline", cibles=None, forcer=(), n_jobs=None, verbose=True):
+    """
+    Exécute le graphe d'étapes en sautant celles qui sont à jour.
+
+    Parameters:
+    -----------
+    etapes : dict
+        Graphe renvoyé par `construire_pipeline`.
+    cache_dir : str
+        Dossier des sorties des étapes et du manifeste.
+    cibles : list, optional
+        Étapes à produire (avec leurs dépendances). Par défaut, toutes.
+    forcer : tuple
+        Étapes à recalculer même si elles sont à jour.
+    n_jobs : int or None
+        Nombre de processus pour les étapes indépendantes. None ou -1 utilise tous les cœurs.
+    verbose : bool
+        Affiche l'état de chaque étape.
+
+    Returns:
+    --------
+    dict
+        {nom: {'statut': 'a_jour' | 'execute' | 'echec' | 'bloque', 'duree_s': float}}, avec le
+        message 'erreur' des étapes en échec.
+
+    Notes:
+    ------
+    - Une étape en échec n'est pas enregistrée dans le manifeste : elle est réexécutée au prochain
+      lancement. Les étapes qui en dépendent sont marquées 'bloque' ; les autres continuent.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+    from .parallele import nombre_processus
+
+    os.makedirs(cache_dir, exist_ok=True)
+    chemin_manifeste = os.path.join(cache_dir, "manifeste.json")
+    manifeste = {}
+    if os.path.exists(chemin_manifeste):
+        with open(chemin_manifeste, encoding="utf-8") as f:
+            manifeste = json.load(f)
+
+    a_produire = _dependances_transitives(etapes, cibles or list(etapes))
+    chemin = {nom: os.path.join(cache_dir, f"{nom}.pkl") for nom in a_produire}
+    empreintes, rapport, en_cours = {}, {}, {}
+
+    def enregistrer(nom, cle, empreinte, statut, duree):
+        empreintes[nom] = empreinte
+        manifeste[nom] = {"cle": cle, "contenu": empreinte}
+        rapport[nom] = {"statut": statut, "duree_s": duree}
+        if verbose:
+            print(f"[{statut}] {nom} ({duree:.2f} s)")
+
+    with ProcessPoolExecutor(max_workers=nombre_processus(n_jobs)) as executor:
+        while len(rapport) < len(a_produire):
+            prets = [
+                nom for nom in sorted(a_produire)
+                if nom not in rapport and nom not in en_cours
+                and all(dep in empreintes for dep in etapes[nom][1])
+            ]
+            for nom in prets:
+                fonction, dependances, params = etapes[nom]
+                cle = _cle_etape(nom, fonction, params, {dep: empreintes[dep] for dep in dependances})
+                precedent = manifeste.get(nom, {})
+                if nom not in forcer and precedent.get("cle") == cle and os.path.exists(chemin[nom]):
+                    enregistrer(nom, cle, precedent["contenu"], "a_jour", 0.0)
+                    continue
+                future = executor.submit(
+                    _executer_etape, fonction, params, {dep: chemin[dep] for dep in dependances}, chemin[nom]
+                )
+                en_cours[future] = (nom, cle)
+
+            if len(rapport) == len(a_produire):
+                break
+            if not en_cours:
+                # Des étapes prêtes viennent d'être déclarées à jour : on réévalue les suivantes
+                continue
+            termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for future in termines:
+                nom, cle = en_cours.pop(future)
+                try:
+                    empreinte, duree = future.result()
+                except Exception as e:
+                    manifeste.pop(nom, None)
+                    rapport[nom] = {"statut": "echec", "duree_s": 0.0, "erreur": f"{type(e).__name__}: {e}"}
+                    if verbose:
+                        print(f"[echec] {nom} : {rapport[nom]['erreur']}")
+                    for bloquee in _descendants(etapes, nom) & a_produire:
+                        rapport.setdefault(bloquee, {"statut": "bloque", "duree_s": 0.0})
+                    continue
+                enregistrer(nom, cle, empreinte, "execute", duree)
+            with open(chemin_manifeste, "w", encoding="utf-8") as f:
+                json.dump(manifeste, f, indent=1)
+
+    with open(chemin_manifeste, "w", encoding="utf-8") as f:
+        json.dump(manifeste, f, indent=1)
+    return rapport
+
+
+def charger_sortie(nom, cache_dir=".pipeline"):
+    """
+    Relit la sortie d'une étape depuis le cache du pipeline.
+    """
+    with open(os.path.join(cache_dir, f"{nom}.pkl"), "rb") as f:
+        return pickle.load(f)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("config", help="Fichier JSON de configuration (voir construire_pipeline)")
+    parser.add_argument("--cache", default=".pipeline", help="Dossier du cache des étapes")
+    parser.add_argument("--jobs", type=int, default=None, help="Nombre de processus")
+    parser.add_argument("--cibles", nargs="*", default=None, help="Étapes à produire")
+    parser.add_argument("--forcer", nargs="*", default=(), help="Étapes à recalculer")
+    parser.add_argument("--liste", action="store_true", help="Affiche les étapes sans les exécuter")
+    args = parser.parse_args(argv)
+
+    with open(args.config, encoding="utf-8") as f:
+        etapes = construire_pipeline(json.load(f))
+    if args.liste:
+        for nom, (_, dependances, _) in etapes.items():
+            print(f"{nom} <- {', '.join(dependances) or '-'}")
+        return
+    rapport = executer_pipeline(etapes, args.cache, args.cibles, tuple(args.forcer), args.jobs)
+    statuts = [etat["statut"] for etat in rapport.values()]
+    print(
+        f"{statuts.count('execute')} étape(s) exécutée(s), {statuts.count('a_jour')} à jour, "
+        f"{statuts.count('echec')} en échec, {statuts.count('bloque')} bloquée(s)."
+    )
+    if "echec" in statuts:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
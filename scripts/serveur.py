@@ -0,0 +1,308 @@
+import asyncio
+import json
+import pickle
+import time
+from urllib.parse import parse_qs, urlsplit
+
+
+class ServeurPrevisions:
+    """
+    Service HTTP local (asyncio) de prévisions de polluants et d'indice ATMO.
+
+    Les modèles VAR ajustés sont chargés une seule fois en mémoire. Les requêtes concurrentes sont
+    regroupées en micro-lots et prévues en un seul appel vectorisé à `forecast_var` ; les réponses
+    sont mises en cache jusqu'à la prochaine mise à jour des modèles ou des données.
+
+    Routes :
+    - GET /prevision?region=R&jours=N : prévisions des N prochains jours pour la région R ;
+    - GET /regions : liste des régions disponibles ;
+    - GET /sante : état du service.
+    """
+
+    def __init__(self, models, jours_max=14, alpha=0.05, delai_lot=0.001):
+        """
+        Parameters:
+        -----------
+        models : dict
+            Dictionnaire {region: (model_fit, data)}, au format de `forecast_var`.
+        jours_max : int
+            Horizon maximal accepté (par défaut 14 jours).
+        alpha : float
+            Niveau des intervalles de prévision renvoyés.
+        delai_lot : float
+            Temps d'attente (en secondes) pour regrouper les requêtes concurrentes en un lot.
+        """
+        self.models = dict(models)
+        self.jours_max = jours_max
+        self.alpha = alpha
+        self.delai_lot = delai_lot
+        self.version = 0
+        self._cache = {}
+        self._file = None
+        self._serveur = None
+
+    def mettre_a_jour(self, models):
+        """
+        Remplace les modèles (nouvelles données ou nouveaux ajustements) et invalide le cache.
+        """
+        self.models = dict(models)
+        self.version += 1
+        self._cache.clear()
+
+    async def prevoir(self, region, jours):
+        """
+        Renvoie la réponse JSON (bytes) des prévisions de `region` sur `jours` jours.
+        """
+        cle = (region, jours)
+        if cle in self._cache:
+            return self._cache[cle]
+        future = asyncio.get_running_loop().create_future()
+        self._file.put_nowait((region, jours, future))
+        return await future
+
+    async def _boucle_lots(self):
+        while True:
+            lot = [await self._file.get()]
+            # Laisse arriver les requêtes concurrentes pour les traiter ensemble
+            await asyncio.sleep(self.delai_lot)
+            while not self._file.empty():
+                lot.append(self._file.get_nowait())
+            self._traiter_lot(lot)
+
+    def _traiter_lot(self, lot):
+        from .indice import SEUILS_ATMO, subindex_array
+        from .modele import SEPARATEUR_VAR, forecast_var
+
+        a_calculer = [(region, jours, future) for region, jours, future in lot if (region, jours) not in self._cache]
+        try:
+            if a_calculer:
+                regions = sorted({region for region, _, _ in a_calculer})
+                steps = max(jours for _, jours, _ in a_calculer)
+                # Tous les horizons de 1 à `steps` : chaque requête du lot garde ses `jours` premiers jours
+                previsions = forecast_var(
+                    {region: self.models[region] for region in regions},
+                    steps=list(range(1, steps + 1)),
+                    alpha=self.alpha,
+                )
+                previsions["day"] = previsions["day"].dt.strftime("%Y-%m-%d")
+
+                par_region = dict(list(previsions.groupby("modele", sort=False)))
+                for region, jours, _ in a_calculer:
+                    if (region, jours) in self._cache:
+                        continue
+                    table = par_region[region]
+                    table = table[table["horizon"] <= jours]
+                    # Variables de la région (VAR multi-régions : colonnes 'region::polluant')
+                    variables = table["variable"].str.split(SEPARATEUR_VAR, n=1, regex=False)
+                    table = table[variables.str.len().eq(1) | variables.str[0].eq(region)].assign(
+                        variable=variables.str[-1]
+                    )
+                    jours_prevus = []
+                    for (day, horizon), groupe in table.groupby(["day", "horizon"], sort=True):
+                        valeurs = dict(zip(groupe["variable"], groupe["prevision"]))
+                        sous_indices = [
+                            int(subindex_array(max(valeurs[polluant], 0), polluant))
+                            for polluant in SEUILS_ATMO
+                            if polluant in valeurs
+                        ]
+                        jours_prevus.append({
+                            "day": day,
+                            "horizon": int(horizon),
+                            "indice_atmo": max(sous_indices) if sous_indices else None,
+                            "previsions": valeurs,
+                            "borne_inf": dict(zip(groupe["variable"], groupe["borne_inf"])),
+                            "borne_sup": dict(zip(groupe["variable"], groupe["borne_sup"])),
+                        })
+                    self._cache[(region, jours)] = json.dumps({
+                        "region": region,
+                        "jours": jours,
+                        "version": self.version,
+                        "previsions": jours_prevus,
+                    }).encode()
+        except Exception as e:
+            for _, _, future in lot:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for region, jours, future in lot:
+            if not future.done():
+                future.set_result(self._cache[(region, jours)])
+
+    async def _router(self, methode, cible):
+        url = urlsplit(cible)
+        params = parse_qs(url.query)
+        if methode != "GET":
+            return 405, b'{"erreur": "methode non supportee"}'
+        if url.path == "/sante":
+            return 200, json.dumps({"statut": "ok", "version": self.version}).encode()
+        if url.path == "/regions":
+            return 200, json.dumps(sorted(self.models)).encode()
+        if url.path == "/prevision":
+            region = params.get("region", [None])[0]
+            try:
+                jours = int(params.get("jours", [self.jours_max])[0])
+            except ValueError:
+                return 400, b'{"erreur": "jours doit etre un entier"}'
+            if region not in self.models:
+                return 404, json.dumps({"erreur": f"region inconnue : {region}"}).encode()
+            if not 1 <= jours <= self.jours_max:
+                return 400, json.dumps({"erreur": f"jours doit etre compris entre 1 et {self.jours_max}"}).encode()
+            return 200, await self.prevoir(region, jours)
+        return 404, b'{"erreur": "route inconnue"}'
+
+    async def _gerer_connexion(self, reader, writer):
+        raisons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+        try:
+            while True:
+                ligne = await reader.readline()
+                if not ligne:
+                    break
+                methode, cible, _ = ligne.decode("latin-1").split(" ", 2)
+                garder = True
+                while True:
+                    entete = await reader.readline()
+                    if entete in (b"\r\n", b"\n", b""):
+                        break
+                    if entete.lower().startswith(b"connection:") and b"close" in entete.lower():
+                        garder = False
+                try:
+                    statut, corps = await self._router(methode, cible)
+                except Exception as e:
+                    statut, corps = 500, json.dumps({"erreur": str(e)}).encode()
+                writer.write(
+                    f"HTTP/1.1 {statut} {raisons[statut]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(corps)}\r\n"
+                    f"Connection: {'keep-alive' if garder else 'close'}\r\n\r\n".encode() + corps
+                )
+                await writer.drain()
+                if not garder:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def demarrer(self, host="127.0.0.1", port=8765):
+        """
+        Démarre le service et la boucle de micro-lots, puis sert les requêtes indéfiniment.
+        """
+        self._file = asyncio.Queue()
+        boucle = asyncio.create_task(self._boucle_lots())
+        self._serveur = await asyncio.start_server(self._gerer_connexion, host, port)
+        try:
+            async with self._serveur:
+                await self._serveur.serve_forever()
+        finally:
+            boucle.cancel()
+
+
+def charger_modeles(chemin):
+    """
+    Charge un dictionnaire {region: (model_fit, data)} sauvegardé avec pickle.
+    """
+    with open(chemin, "rb") as f:
+        return pickle.load(f)
+
+
+def lancer_serveur(models, host="127.0.0.1", port=8765, **kwargs):
+    """
+    Lance le service de prévisions sur `host:port` (localhost par défaut).
+
+    Parameters:
+    -----------
+    models : dict or str
+        Dictionnaire {region: (model_fit, data)} ou chemin d'un fichier pickle le contenant.
+    kwargs :
+        Options transmises à `ServeurPrevisions` (jours_max, alpha, delai_lot).
+    """
+    if isinstance(models, str):
+        models = charger_modeles(models)
+    asyncio.run(ServeurPrevisions(models, **kwargs).demarrer(host, port))
+
+
+async def _client_charge(host, port, cibles, latences):
+    reader, writer = await asyncio.open_connection(host, port)
+    requete_base = "GET {} HTTP/1.1\r\nHost: {}\r\n\r\n"
+    try:
+        for cible in cibles:
+            debut = time.perf_counter()
+            writer.write(requete_base.format(cible, host).encode())
+            await writer.drain()
+            longueur = 0
+            while True:
+                entete = await reader.readline()
+                if entete in (b"\r\n", b""):
+                    break
+                if entete.lower().startswith(b"content-length:"):
+                    longueur = int(entete.split(b":", 1)[1])
+            await reader.readexactly(longueur)
+            latences.append(time.perf_counter() - debut)
+    finally:
+        writer.close()
+
+
+def mesurer_charge(regions, host="127.0.0.1", port=8765, jours=(1, 3, 7, 14), n_requetes=10000, concurrence=64):
+    """
+    Test de charge du service sur localhost avec des connexions persistantes concurrentes.
+
+    Parameters:
+    -----------
+    regions : list
+        Régions interrogées (tirées à tour de rôle).
+    host, port :
+        Adresse du service.
+    jours : tuple
+        Horizons demandés à tour de rôle.
+    n_requetes : int
+        Nombre total de requêtes.
+    concurrence : int
+        Nombre de clients simultanés.
+
+    Returns:
+    --------
+    dict
+        'n_requetes', 'duree_s', 'debit_rps' et les latences 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'.
+    """
+    cibles = [
+        f"/prevision?region={regions[i % len(regions)]}&jours={jours[i % len(jours)]}"
+        for i in range(n_requetes)
+    ]
+
+    async def executer():
+        latences = []
+        debut = time.perf_counter()
+        await asyncio.gather(*(
+            _client_charge(host, port, cibles[i::concurrence], latences)
+            for i in range(concurrence)
+        ))
+        return latences, time.perf_counter() - debut
+
+    latences, duree = asyncio.run(executer())
+    latences.sort()
+
+    def quantile(q):
+        return 1000 * latences[min(len(latences) - 1, int(q * len(latences)))]
+
+    return {
+        "n_requetes": len(latences),
+        "duree_s": duree,
+        "debit_rps": len(latences) / duree,
+        "p50_ms": quantile(0.50),
+        "p90_ms": quantile(0.90),
+        "p99_ms": quantile(0.99),
+        "max_ms": 1000 * latences[-1],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Service local de prévisions ATMO")
+    parser.add_argument("modeles", help="Fichier pickle {region: (model_fit, data)}")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--jours-max", type=int, default=14)
+    args = parser.parse_args()
+    lancer_serveur(args.modeles, host=args.host, port=args.port, jours_max=args.jours_max)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+class IndexRegions:
+    """
+    Index spatial (STRtree) des géométries des régions, pour attribuer une région à des points
+    longitude/latitude quelconques (stations, points de grille...) de manière vectorisée.
+    """
+
+    def __init__(self, france, region_col="LIBELLE_REGION"):
+        """
+        Parameters:
+        -----------
+        france : geopandas.GeoDataFrame
+            GeoDataFrame des régions (INSEE), dans n'importe quel CRS : les géométries sont
+            ramenées en EPSG:4326.
+        region_col : str
+            Colonne contenant le nom des régions (par défaut 'LIBELLE_REGION').
+        """
+        import shapely
+
+        geo = france if france.crs is not None and france.crs.to_epsg() == 4326 else france.to_crs(epsg=4326)
+        self.regions = np.asarray(geo[region_col], dtype=object)
+        self.geometries = geo.geometry.to_numpy()
+        shapely.prepare(self.geometries)
+        self.arbre = shapely.STRtree(self.geometries)
+        self.empreinte = hashlib.sha1(
+            b"".join(shapely.to_wkb(self.geometries)) + "|".join(map(str, self.regions)).encode()
+        ).hexdigest()
+
+    def localiser(self, longitudes, latitudes, taille_lot=1_000_000):
+        """
+        Renvoie, pour chaque point, la position de sa région dans `self.regions` (-1 hors des régions).
+
+        Les points sont traités par lots de `taille_lot` : chaque lot est une seule requête
+        vectorisée sur l'arbre, sans boucle Python par point.
+        """
+        import shapely
+
+        longitudes = np.asarray(longitudes, dtype=float)
+        latitudes = np.asarray(latitudes, dtype=float)
+        positions = np.full(len(longitudes), -1, dtype=np.int64)
+        for debut in range(0, len(longitudes), taille_lot):
+            fin = debut + taille_lot
+            points = shapely.points(longitudes[debut:fin], latitudes[debut:fin])
+            idx_points, idx_regions = self.arbre.query(points, predicate="intersects")
+            # Un point sur une frontière commune est attribué à la dernière région trouvée
+            positions[debut + idx_points] = idx_regions
+        return positions
+
+    def regions_de(self, longitudes, latitudes, taille_lot=1_000_000):
+        """
+        Renvoie le nom de la région de chaque point (None hors des régions).
+        """
+        positions = self.localiser(longitudes, latitudes, taille_lot)
+        noms = np.empty(len(positions), dtype=object)
+        dedans = positions >= 0
+        noms[dedans] = self.regions[positions[dedans]]
+        return noms
+
+    def centroides(self):
+        """
+        Renvoie la liste des triplets (région, longitude, latitude) des centroïdes, au format
+        `region_centroides` attendu par `recup_data`.
+        """
+        import shapely
+
+        centres = shapely.centroid(self.geometries)
+        return [
+            (region, float(x), float(y))
+            for region, x, y in zip(self.regions, shapely.get_x(centres), shapely.get_y(centres))
+        ]
+
+
+def attribuer_regions(df, france, lon_col="longitude", lat_col="latitude", region_col="region"):
+    """
+    Ajoute à `df` une colonne `region_col` contenant la région de chaque ligne, déduite de ses
+    coordonnées par un `IndexRegions` construit sur `france`.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Copie de `df` avec la colonne de région (None pour les points hors des régions).
+    """
+    index = france if isinstance(france, IndexRegions) else IndexRegions(france)
+    return df.assign(**{region_col: index.regions_de(df[lon_col].to_numpy(), df[lat_col].to_numpy())})
+
+
+def region_centroides(france, chemin=".cache_region_centroides.json"):
+    """
+    Renvoie la table `region_centroides` (liste de triplets (région, longitude, latitude)) consommée
+    par `recup_data`, calculée à partir des géométries comme dans `Infos_géographiques_france.ipynb`.
+
+    Parameters:
+    -----------
+    france : geopandas.GeoDataFrame ou IndexRegions
+        Régions avec géométries. Si None, la table est relue depuis `chemin`.
+    chemin : str or None
+        Fichier JSON de cache. La table y est réécrite lorsque les géométries ont changé.
+
+    Returns:
+    --------
+    list
+        Liste de tuples (région, longitude, latitude).
+    """
+    if france is None:
+        with open(chemin, encoding="utf-8") as f:
+            return [tuple(triplet) for triplet in json.load(f)["region_centroides"]]
+
+    index = france if isinstance(france, IndexRegions) else IndexRegions(france)
+    if chemin is not None and os.path.exists(chemin):
+        with open(chemin, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("empreinte") == index.empreinte:
+            return [tuple(triplet) for triplet in cache["region_centroides"]]
+
+    centroides = index.centroides()
+    if chemin is not None:
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump({"empreinte": index.empreinte, "region_centroides": centroides}, f, ensure_ascii=False, indent=1)
+    return centroides
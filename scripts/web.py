@@ -0,0 +1,132 @@
+import gzip
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def export_regions_geojson(france, chemin, niveau=2, decimales=4):
+    """
+    Écrit les géométries simplifiées des régions en GeoJSON (EPSG:4326) pour un client web.
+
+    Paramètres
+    ----------
+    france : geopandas.GeoDataFrame ou CacheGeometrie
+        Régions françaises avec géométries.
+    chemin : str
+        Fichier GeoJSON de sortie.
+    niveau : int
+        Niveau de simplification des géométries (voir `CacheGeometrie`, par défaut 2).
+    decimales : int
+        Nombre de décimales conservées sur les coordonnées (4 décimales ≈ 10 m).
+
+    Chaque entité porte les propriétés 'id' (position de la région dans les tableaux de valeurs)
+    et 'region' (nom de la région).
+    """
+    import geopandas as gpd
+    import shapely
+    from .geometrie import obtenir_cache_geometrie
+
+    cache = obtenir_cache_geometrie(france)
+    geometries = cache.geometries(niveau).to_crs(epsg=4326)
+    geometries = shapely.set_precision(geometries.to_numpy(), grid_size=10 ** -decimales)
+    regions = gpd.GeoDataFrame(
+        {"id": np.arange(len(cache.regions)), "region": cache.regions},
+        geometry=geometries,
+        crs="EPSG:4326",
+    )
+    with open(chemin, "w", encoding="utf-8") as f:
+        f.write(regions.to_json(drop_id=True, ensure_ascii=False))
+
+
+def export_web_atmo(df, france, dossier, niveau=2, decimales=4, ecraser_geometries=False):
+    """
+    Exporte l'historique quotidien de l'indice ATMO pour une carte web statique.
+
+    Paramètres
+    ----------
+    df : pandas.DataFrame
+        Données contenant les colonnes 'region', 'day' et 'indice_atmo' (par exemple la sortie de `atmo`).
+    france : geopandas.GeoDataFrame ou CacheGeometrie
+        Régions françaises avec géométries.
+    dossier : str
+        Dossier de sortie (créé si nécessaire).
+    niveau : int
+        Niveau de simplification des géométries exportées.
+    decimales : int
+        Nombre de décimales conservées sur les coordonnées.
+    ecraser_geometries : bool
+        Réécrit 'regions.geojson' même s'il existe déjà. Par défaut, il n'est réécrit que si les
+        géométries, l'ordre des régions, `niveau` ou `decimales` diffèrent de ceux enregistrés
+        dans 'atmo.json' lors de l'export précédent.
+
+    Retour
+    ------
+    dict
+        Mesures de l'export : durée de chaque étape ('duree_geometries_s', 'duree_valeurs_s') et,
+        pour chaque fichier, sa taille brute et compressée gzip (taille transférée par un serveur
+        statique qui compresse ses réponses).
+
+    Fichiers produits
+    -----------------
+    - 'regions.geojson' : géométries simplifiées, une entité par région avec sa propriété 'id' ;
+    - 'atmo.bin' : tableau uint8 jours × régions (ordre ligne par ligne), 0 pour une valeur manquante,
+      sinon l'indice ATMO de 1 à 10 ;
+    - 'atmo.json' : métadonnées du tableau ('debut', 'n_jours', 'regions', 'forme') et des
+      géométries exportées ('geometries' : empreinte, tolérances, niveau, décimales).
+
+    Le client charge une fois les géométries et le tableau, puis colorie la carte du jour j avec les
+    octets j * n_regions à (j + 1) * n_regions, sans aucun rendu côté serveur.
+    """
+    from .geometrie import obtenir_cache_geometrie
+
+    os.makedirs(dossier, exist_ok=True)
+    cache = obtenir_cache_geometrie(france)
+    mesures = {}
+
+    debut = time.perf_counter()
+    chemin_geojson = os.path.join(dossier, "regions.geojson")
+    chemin_meta = os.path.join(dossier, "atmo.json")
+    geometries = {
+        "empreinte": cache.empreinte,
+        "tolerances": list(cache.tolerances),
+        "niveau": niveau,
+        "decimales": decimales,
+    }
+    precedentes = None
+    if os.path.exists(chemin_meta):
+        with open(chemin_meta, encoding="utf-8") as f:
+            precedentes = json.load(f).get("geometries")
+    # Les colonnes de 'atmo.bin' suivent l'ordre de `cache.regions` : un GeoJSON exporté pour
+    # d'autres géométries ou un autre ordre placerait les valeurs sur les mauvais polygones
+    if ecraser_geometries or precedentes != geometries or not os.path.exists(chemin_geojson):
+        export_regions_geojson(cache, chemin_geojson, niveau=niveau, decimales=decimales)
+    mesures["duree_geometries_s"] = time.perf_counter() - debut
+
+    debut = time.perf_counter()
+    tableau = df.assign(day=pd.to_datetime(df['day'])).pivot_table(
+        index='day', columns='region', values='indice_atmo', aggfunc='first'
+    )
+    tableau = tableau.reindex(columns=cache.regions).asfreq('D')
+    valeurs = tableau.fillna(0).to_numpy().astype(np.uint8)
+    with open(os.path.join(dossier, "atmo.bin"), "wb") as f:
+        f.write(valeurs.tobytes(order="C"))
+    with open(chemin_meta, "w", encoding="utf-8") as f:
+        json.dump({
+            "debut": tableau.index[0].strftime("%Y-%m-%d"),
+            "n_jours": int(valeurs.shape[0]),
+            "regions": list(cache.regions),
+            "forme": list(valeurs.shape),
+            "type": "uint8",
+            "manquant": 0,
+            "geometries": geometries,
+        }, f, ensure_ascii=False)
+    mesures["duree_valeurs_s"] = time.perf_counter() - debut
+
+    for nom in ("regions.geojson", "atmo.bin", "atmo.json"):
+        with open(os.path.join(dossier, nom), "rb") as f:
+            contenu = f.read()
+        mesures[nom] = {"octets": len(contenu), "octets_gzip": len(gzip.compress(contenu))}
+    return mesures